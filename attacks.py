@@ -0,0 +1,295 @@
+import random
+import time
+
+import rules
+from rules import King, Queen, Bishop, Knight, Rook, Pawn
+
+
+# Attack maps and static exchange evaluation (SEE).
+# AttackMap keeps, for every square, how many white and black pieces attack it.
+# After a move only the pieces whose attacks can have changed are recomputed:
+# the pieces on the squares the move touched, and the sliding pieces (bishops,
+# rooks, queens) whose lines ran through one of those squares. That is a handful
+# of pieces instead of the whole board.
+
+bishop_directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+rook_directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+queen_directions = bishop_directions + rook_directions
+knight_offsets = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+
+# Value used for the king in exchanges, so it is always the last piece to capture
+KING_EXCHANGE_VALUE = 20000
+
+
+def on_board(row, col):
+    return 0 <= row < rules.board_size and 0 <= col < rules.board_size
+
+
+def is_slider(piece):
+    return isinstance(piece, (Bishop, Rook, Queen))
+
+
+def piece_attacks(piece, board):
+    # Squares attacked by a piece. Unlike get_valid_moves this includes squares with
+    # friendly pieces on them (they are defended) and ignores pins.
+    row, col = piece.position
+    squares = []
+    if isinstance(piece, Pawn):
+        direction = -1 if piece.color == 'white' else 1
+        for delta_col in (-1, 1):
+            if on_board(row + direction, col + delta_col):
+                squares.append((row + direction, col + delta_col))
+    elif isinstance(piece, (Knight, King)):
+        offsets = knight_offsets if isinstance(piece, Knight) else queen_directions
+        for delta_row, delta_col in offsets:
+            if on_board(row + delta_row, col + delta_col):
+                squares.append((row + delta_row, col + delta_col))
+    else:
+        if isinstance(piece, Bishop):
+            directions = bishop_directions
+        elif isinstance(piece, Rook):
+            directions = rook_directions
+        else:
+            directions = queen_directions
+        for delta_row, delta_col in directions:
+            new_row, new_col = row + delta_row, col + delta_col
+            while on_board(new_row, new_col):
+                squares.append((new_row, new_col))
+                if board[new_row][new_col] is not None:
+                    break
+                new_row += delta_row
+                new_col += delta_col
+    return squares
+
+
+class AttackMap:
+    # Per-square attack counts for both colors, kept up to date move by move.
+    def __init__(self, board):
+        self.rebuild(board)
+
+    def rebuild(self, board):
+        # Recompute everything from scratch.
+        size = rules.board_size
+        self.attacks = {}  # piece -> list of squares it attacks
+        self.attackers = [[set() for _ in range(size)] for _ in range(size)]  # square -> pieces attacking it
+        self.occupant = [[None] * size for _ in range(size)]  # The piece we last saw on each square
+        self.counts = {color: [[0] * size for _ in range(size)] for color in ('white', 'black')}
+        for row in range(size):
+            for col in range(size):
+                piece = board[row][col]
+                if piece is not None:
+                    self.occupant[row][col] = piece
+                    self.add(piece, board)
+
+    def add(self, piece, board):
+        squares = piece_attacks(piece, board)
+        self.attacks[piece] = squares
+        counts = self.counts[piece.color]
+        for row, col in squares:
+            self.attackers[row][col].add(piece)
+            counts[row][col] += 1
+
+    def remove(self, piece):
+        counts = self.counts[piece.color]
+        for row, col in self.attacks.pop(piece):
+            self.attackers[row][col].discard(piece)
+            counts[row][col] -= 1
+
+    def update(self, board, squares):
+        # Bring the map up to date after the contents of the given squares changed
+        # (see rules.changed_squares for the squares touched by a move).
+        # Sliders attacking a changed square are the only ones whose lines can have
+        # grown or shrunk, so collect them before anything is changed.
+        sliders = set()
+        for row, col in squares:
+            for piece in self.attackers[row][col]:
+                if is_slider(piece):
+                    sliders.add(piece)
+
+        # Drop pieces that left the changed squares (moved, captured or promoted)
+        for row, col in squares:
+            old = self.occupant[row][col]
+            if old is not None and old is not board[row][col] and old in self.attacks:
+                self.remove(old)
+            self.occupant[row][col] = board[row][col]
+
+        # Add the pieces that are now on the changed squares
+        refreshed = set()
+        for row, col in squares:
+            piece = board[row][col]
+            if piece is not None and piece not in refreshed:
+                if piece in self.attacks:
+                    self.remove(piece)
+                self.add(piece, board)
+                refreshed.add(piece)
+
+        # Recompute the lines of the affected sliders that are still on the board
+        for piece in sliders:
+            if piece in self.attacks and piece not in refreshed:
+                self.remove(piece)
+                self.add(piece, board)
+
+    def attack_count(self, square, color):
+        # Number of pieces of the given color attacking the square.
+        return self.counts[color][square[0]][square[1]]
+
+
+def static_exchange(board, square, color, first_attacker=None):
+    # Material (in centipawns) that the given color wins by starting a sequence of
+    # captures on the square, if both sides keep capturing with their least valuable
+    # piece and may stop whenever continuing would lose material. Pins are ignored.
+    # If first_attacker is given, that piece makes the first capture.
+    row, col = square
+    target = board[row][col]
+    if target is None or target.color == color:
+        return 0
+
+    # Pieces along each line from the square, nearest first, with their distance
+    lines = []
+    for delta_row, delta_col in queen_directions:
+        line = []
+        distance = 1
+        new_row, new_col = row + delta_row, col + delta_col
+        while on_board(new_row, new_col):
+            if board[new_row][new_col] is not None:
+                line.append((board[new_row][new_col], distance))
+            new_row += delta_row
+            new_col += delta_col
+            distance += 1
+        lines.append(((delta_row, delta_col), line))
+    knights = [board[row + delta_row][col + delta_col] for delta_row, delta_col in knight_offsets
+               if on_board(row + delta_row, col + delta_col)
+               and isinstance(board[row + delta_row][col + delta_col], Knight)]
+    used = set()
+
+    def can_attack_along(piece, direction, distance):
+        diagonal = direction[0] != 0 and direction[1] != 0
+        if isinstance(piece, Queen):
+            return True
+        if isinstance(piece, Bishop):
+            return diagonal
+        if isinstance(piece, Rook):
+            return not diagonal
+        if isinstance(piece, King):
+            return distance == 1
+        if isinstance(piece, Pawn):
+            # A white pawn attacks upwards, so it sits below (higher row than) the square
+            return diagonal and distance == 1 and direction[0] == (1 if piece.color == 'white' else -1)
+        return False
+
+    def available(side):
+        # Pieces of the given side that can capture on the square right now
+        pieces = [knight for knight in knights if knight.color == side and knight not in used]
+        for direction, line in lines:
+            for piece, distance in line:
+                if piece in used:
+                    continue
+                # The nearest unused piece on a line blocks everything behind it
+                if piece.color == side and can_attack_along(piece, direction, distance):
+                    pieces.append(piece)
+                break
+        return pieces
+
+    def exchange_value(piece):
+        return KING_EXCHANGE_VALUE if isinstance(piece, King) else piece.value
+
+    def least_valuable(side):
+        pieces = available(side)
+        return min(pieces, key=exchange_value) if pieces else None
+
+    attacker = first_attacker if first_attacker is not None else least_valuable(color)
+    if attacker is None:
+        return 0
+    used.add(attacker)
+    gains = [exchange_value(target)]
+    value_on_square = exchange_value(attacker)
+    side = rules.opponent(color)
+    while True:
+        attacker = least_valuable(side)
+        if attacker is None:
+            break
+        if isinstance(attacker, King) and least_valuable(rules.opponent(side)) is not None:
+            break  # The king can't capture onto a square that is still defended
+        used.add(attacker)
+        gains.append(value_on_square - gains[-1])
+        value_on_square = exchange_value(attacker)
+        side = rules.opponent(side)
+
+    # Each side can choose to stop capturing, so fold the gains back from the end
+    for index in range(len(gains) - 1, 0, -1):
+        gains[index - 1] = -max(-gains[index - 1], gains[index])
+    return gains[0]
+
+
+def see_move(board, move):
+    # Static exchange value of a capture move, from the point of view of the side making it.
+    start, end, _ = move
+    piece = board[start[0]][start[1]]
+    if board[end[0]][end[1]] is None:
+        # En passant: the captured pawn isn't on the target square, so just count the pawn
+        return Pawn.value if isinstance(piece, Pawn) and end == board.en_passant_target else 0
+    return static_exchange(board, end, piece.color, first_attacker=piece)
+
+
+def hanging_pieces(board, attack_map):
+    # Pieces (other than kings) that are attacked and either undefended or lose
+    # material to the best capture sequence on their square.
+    hanging = []
+    for row in range(rules.board_size):
+        for col in range(rules.board_size):
+            piece = board[row][col]
+            if piece is None or isinstance(piece, King):
+                continue
+            attacker_color = rules.opponent(piece.color)
+            if attack_map.attack_count((row, col), attacker_color) == 0:
+                continue
+            if attack_map.attack_count((row, col), piece.color) == 0 or \
+                    static_exchange(board, (row, col), attacker_color) > 0:
+                hanging.append(piece)
+    return hanging
+
+
+def benchmark(games=5, plies=80, seed=1):
+    # Compare updating the attack map after each move with rebuilding it from scratch,
+    # over a few random games, and check that both give the same counts.
+    rng = random.Random(seed)
+    update_time = rebuild_time = see_time = 0.0
+    moves_played = see_calls = 0
+    for _ in range(games):
+        board, color = rules.board_from_fen(rules.START_FEN)
+        attack_map = AttackMap(board)
+        for _ in range(plies):
+            moves = rules.generate_moves(color, board)
+            if not moves:
+                break
+            start = time.perf_counter()
+            for capture in moves:
+                if board[capture[1][0]][capture[1][1]] is not None:
+                    see_move(board, capture)
+                    see_calls += 1
+            see_time += time.perf_counter() - start
+
+            move = rng.choice(moves)
+            undo = rules.make_move(board, move)
+            color = rules.opponent(color)
+
+            start = time.perf_counter()
+            attack_map.update(board, rules.changed_squares(undo))
+            update_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            fresh = AttackMap(board)
+            rebuild_time += time.perf_counter() - start
+            if fresh.counts != attack_map.counts:
+                raise AssertionError(f"Attack map out of date after {rules.move_to_uci(move)}")
+            moves_played += 1
+
+    print(f"Moves played            : {moves_played}")
+    print(f"Incremental update (us) : {update_time / moves_played * 1e6:.1f} per move")
+    print(f"Full recompute (us)     : {rebuild_time / moves_played * 1e6:.1f} per move")
+    if see_calls:
+        print(f"Static exchange (us)    : {see_time / see_calls * 1e6:.1f} per capture")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,335 @@
+import threading
+import time
+
+import attacks
+import instrumentation
+import rules
+from rules import Pawn, Knight, Bishop
+
+
+# A small alpha-beta search on top of the rules in rules.py.
+# It is used by the UCI front-end (uci.py) and the analysis mode of the game window,
+# and is deliberately simple: iterative deepening, a transposition table, captures
+# ordered by static exchange evaluation and a capture-only quiescence search.
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000  # Scores above this are "mate in N"
+INFINITY = MATE_SCORE + 1
+
+# Transposition table entry flags
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+# Small positional bonuses (in centipawns) from white's point of view, indexed [row][col]
+pawn_bonus = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [50, 50, 50, 50, 50, 50, 50, 50],
+    [10, 10, 20, 30, 30, 20, 10, 10],
+    [5, 5, 10, 25, 25, 10, 5, 5],
+    [0, 0, 0, 20, 20, 0, 0, 0],
+    [5, -5, -10, 0, 0, -10, -5, 5],
+    [5, 10, 10, -20, -20, 10, 10, 5],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+]
+centre_bonus = [
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+    [-40, -20, 0, 0, 0, 0, -20, -40],
+    [-30, 0, 10, 15, 15, 10, 0, -30],
+    [-30, 5, 15, 20, 20, 15, 5, -30],
+    [-30, 0, 15, 20, 20, 15, 0, -30],
+    [-30, 5, 10, 15, 15, 10, 5, -30],
+    [-40, -20, 0, 5, 5, 0, -20, -40],
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+]
+
+
+class SearchStopped(Exception):
+    # Raised inside the search when it runs out of time or is told to stop.
+    pass
+
+
+def evaluate(board, color):
+    # Static evaluation in centipawns from the point of view of the given color.
+    score = 0
+    for row in range(rules.board_size):
+        for col in range(rules.board_size):
+            piece = board[row][col]
+            if piece is None:
+                continue
+            # Flip the row for black so the tables can be written from white's side
+            table_row = row if piece.color == 'white' else rules.board_size - 1 - row
+            value = piece.value
+            if isinstance(piece, Pawn):
+                value += pawn_bonus[table_row][col]
+            elif isinstance(piece, (Knight, Bishop)):
+                value += centre_bonus[table_row][col] // (1 if isinstance(piece, Knight) else 2)
+            score += value if piece.color == 'white' else -value
+    return score if color == 'white' else -score
+
+
+def is_capture(board, move):
+    # True if the move takes a piece (including en passant).
+    start, end, _ = move
+    if board[end[0]][end[1]] is not None:
+        return True
+    return isinstance(board[start[0]][start[1]], Pawn) and end == board.en_passant_target
+
+
+def capture_order(board, move):
+    # Static exchange value of the capture, so winning captures come first and
+    # captures that lose material come last; queen promotions count as a win.
+    if is_capture(board, move):
+        score = attacks.see_move(board, move)
+    else:
+        score = 0
+    return score + (800 if move[2] == 'q' else 0)
+
+
+def score_to_uci(score):
+    # Convert a search score to the UCI "cp x" / "mate n" form.
+    if score > MATE_THRESHOLD:
+        return f"mate {(MATE_SCORE - score + 1) // 2}"
+    if score < -MATE_THRESHOLD:
+        return f"mate -{(MATE_SCORE + score + 1) // 2}"
+    return f"cp {score}"
+
+
+class Search:
+    # Iterative deepening alpha-beta search. The transposition table is kept between
+    # calls to search() so later searches can reuse earlier work; call clear() for a new game.
+    def __init__(self, table_size=1 << 20):
+        self.table = {}  # position hash -> (depth, score, flag, best move)
+        self.table_size = table_size
+        self.nodes = 0
+        self.deadline = None
+        self.stop_event = threading.Event()
+
+    def clear(self):
+        # Forget everything learned so far.
+        self.table.clear()
+
+    def stop(self):
+        # Ask a running search to return as soon as possible.
+        self.stop_event.set()
+
+    def reset_stop(self):
+        # Give the next search a fresh stop flag. Call this before starting a search in a
+        # thread, so a stop() meant for an earlier search can't cancel the new one.
+        self.stop_event = threading.Event()
+
+    def search(self, board, color, depth=64, movetime=None, info=None):
+        # Search the position and return (best move, score, principal variation).
+        # info, if given, is called after every completed iteration with
+        # (depth, score, nodes, seconds, pv).
+        self.nodes = 0
+        start_time = time.perf_counter()
+        self.deadline = start_time + movetime if movetime is not None else None
+
+        moves = rules.generate_moves(color, board)
+        if not moves:
+            return None, 0, []
+        best_move, best_score, pv = moves[0], 0, [moves[0]]
+        for current_depth in range(1, depth + 1):
+            try:
+                score = self.negamax(board, color, current_depth, -INFINITY, INFINITY, 0)
+            except SearchStopped:
+                break
+            pv = self.principal_variation(board, color, current_depth)
+            if pv:
+                best_move, best_score = pv[0], score
+            if info is not None:
+                info(current_depth, score, self.nodes, time.perf_counter() - start_time, pv)
+            if abs(score) > MATE_THRESHOLD:
+                break  # Found a forced mate; searching deeper cannot improve it
+        instrumentation.count('search_nodes', self.nodes)
+        return best_move, best_score, pv
+
+    def check_stop(self):
+        if self.stop_event.is_set() or (self.deadline is not None and time.perf_counter() > self.deadline):
+            raise SearchStopped()
+
+    def store(self, key, depth, score, flag, move):
+        # Add a transposition table entry, dropping the oldest entry when the table is full.
+        if key not in self.table and len(self.table) >= self.table_size:
+            del self.table[next(iter(self.table))]
+        self.table[key] = (depth, score, flag, move)
+
+    def negamax(self, board, color, depth, alpha, beta, ply):
+        self.nodes += 1
+        self.check_stop()
+        if depth <= 0:
+            return self.quiescence(board, color, alpha, beta, ply)
+
+        key = rules.position_hash(board, color)
+        entry = self.table.get(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, entry_score, flag, table_move = entry
+            if entry_depth >= depth and ply > 0:
+                # Mate scores are stored relative to the position, so adjust them by ply
+                if entry_score > MATE_THRESHOLD:
+                    entry_score -= ply
+                elif entry_score < -MATE_THRESHOLD:
+                    entry_score += ply
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER_BOUND and entry_score >= beta:
+                    return entry_score
+                if flag == UPPER_BOUND and entry_score <= alpha:
+                    return entry_score
+
+        moves = rules.generate_moves(color, board)
+        if not moves:
+            # Checkmate or stalemate
+            return -MATE_SCORE + ply if rules.is_in_check(color, board) else 0
+
+        moves.sort(key=lambda move: self.move_order(board, move, table_move), reverse=True)
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, moves[0]
+        opponent = rules.opponent(color)
+        for move in moves:
+            undo = rules.make_move(board, move)
+            try:
+                score = -self.negamax(board, opponent, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                rules.undo_move(board, undo)
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        stored_score = best_score
+        if stored_score > MATE_THRESHOLD:
+            stored_score += ply
+        elif stored_score < -MATE_THRESHOLD:
+            stored_score -= ply
+        self.store(key, depth, stored_score, flag, best_move)
+        return best_score
+
+    def quiescence(self, board, color, alpha, beta, ply):
+        # Only look at captures so the evaluation is not taken in the middle of an exchange.
+        stand_pat = evaluate(board, color)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        captures = []
+        for move in rules.generate_moves(color, board):
+            if is_capture(board, move):
+                order = capture_order(board, move)
+                # Captures that lose material can't raise the score above standing pat
+                if order >= 0:
+                    captures.append((order, move))
+        captures.sort(key=lambda capture: capture[0], reverse=True)
+        opponent = rules.opponent(color)
+        for _, move in captures:
+            self.nodes += 1
+            self.check_stop()
+            undo = rules.make_move(board, move)
+            try:
+                score = -self.quiescence(board, opponent, -beta, -alpha, ply + 1)
+            finally:
+                rules.undo_move(board, undo)
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def move_order(self, board, move, table_move):
+        # Higher is searched first: the transposition table move, then captures that don't
+        # lose material, then quiet moves, and finally captures that lose material.
+        if move == table_move:
+            return 1000000
+        if is_capture(board, move) or move[2] is not None:
+            score = capture_order(board, move)
+            return 10000 + score if score >= 0 else score - 10000
+        return 0
+
+    def principal_variation(self, board, color, depth):
+        # Follow the best moves stored in the transposition table.
+        pv = []
+        undos = []
+        seen = set()
+        for _ in range(depth):
+            key = rules.position_hash(board, color)
+            entry = self.table.get(key)
+            if entry is None or key in seen:
+                break
+            move = entry[3]
+            if move not in rules.generate_moves(color, board):
+                break
+            seen.add(key)
+            pv.append(move)
+            undos.append(rules.make_move(board, move))
+            color = rules.opponent(color)
+        for undo in reversed(undos):
+            rules.undo_move(board, undo)
+        return pv
+
+
+def white_score(score, color):
+    # Convert a score for the side to move into a score from white's point of view.
+    return score if color == 'white' else -score
+
+
+def white_share(score):
+    # How much of the evaluation bar belongs to white (0 to 1) for a score from white's side.
+    if score > MATE_THRESHOLD:
+        return 1.0
+    if score < -MATE_THRESHOLD:
+        return 0.0
+    return 1 / (1 + 10 ** (-score / 400))
+
+
+class Analyzer:
+    # Keeps searching a position in a background thread until the position changes.
+    # The same Search (and so the same transposition table) is used for every position,
+    # so when the move the analysis predicted is played, the new search starts with
+    # that whole subtree already in the table and catches up to the old depth at once.
+    def __init__(self, search=None, max_depth=64):
+        self.search = search if search is not None else Search()
+        self.max_depth = max_depth
+        self.thread = None
+        self.fen = None  # Position currently being analysed
+        self.lock = threading.Lock()
+        self.result = None  # (depth, score from white's side, pv, nodes) of the last finished iteration
+
+    def analyze(self, board, color):
+        # Start analysing a position, unless it is the one already being analysed.
+        fen = rules.board_to_fen(board, color)
+        if fen == self.fen:
+            return
+        self.stop()
+        self.fen = fen
+        # The background search works on its own copy of the position
+        board_copy, color = rules.board_from_fen(fen)
+        self.search.reset_stop()
+        self.thread = threading.Thread(target=self.run, args=(board_copy, color), daemon=True)
+        self.thread.start()
+
+    def run(self, board, color):
+        def info(depth, score, nodes, seconds, pv):
+            with self.lock:
+                self.result = (depth, white_score(score, color), pv, nodes)
+
+        self.search.search(board, color, depth=self.max_depth, info=info)
+
+    def stop(self):
+        # Stop the background search and forget the analysed position.
+        if self.thread is not None:
+            self.search.stop()
+            self.thread.join()
+            self.thread = None
+        self.fen = None
+        with self.lock:
+            self.result = None
+
+    def latest(self):
+        # The most recent (depth, score, pv, nodes), or None if no iteration has finished yet.
+        with self.lock:
+            return self.result
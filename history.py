@@ -0,0 +1,86 @@
+import rules
+
+
+# Move history for undo/redo and game review.
+# Every move is stored as a compact (start, end, promotion) tuple, and every
+# KEYFRAME_INTERVAL plies a full position (FEN) is stored as a keyframe. Seeking to
+# any ply loads the nearest keyframe at or before it and replays at most
+# KEYFRAME_INTERVAL - 1 moves, so jumping around a long game takes the same time
+# as jumping around a short one.
+
+KEYFRAME_INTERVAL = 16
+
+
+class MoveHistory:
+    def __init__(self, start_fen=rules.START_FEN):
+        self.moves = []  # Per-move deltas: (start, end, promotion) tuples
+        self.keyframes = [start_fen]  # keyframes[i] is the FEN after i * KEYFRAME_INTERVAL plies
+        self.start_color = rules.board_from_fen(start_fen)[1]
+
+    def __len__(self):
+        return len(self.moves)
+
+    def color_at(self, ply):
+        # Color to move after the given number of plies.
+        return self.start_color if ply % 2 == 0 else rules.opponent(self.start_color)
+
+    def truncate(self, ply):
+        # Forget every move after the given ply (used when a new move is played after going back).
+        del self.moves[ply:]
+        del self.keyframes[ply // KEYFRAME_INTERVAL + 1:]
+
+    def append(self, move, board):
+        # Record a move that has just been played on the board.
+        self.moves.append(move)
+        ply = len(self.moves)
+        if ply % KEYFRAME_INTERVAL == 0:
+            self.keyframes.append(rules.board_to_fen(board, self.color_at(ply)))
+
+    def position_at(self, ply):
+        # Return a new (board, color to move) for the position after the given ply.
+        ply = max(0, min(ply, len(self.moves)))
+        keyframe = ply // KEYFRAME_INTERVAL
+        board, color = rules.board_from_fen(self.keyframes[keyframe])
+        for move in self.moves[keyframe * KEYFRAME_INTERVAL:ply]:
+            rules.make_move(board, move)
+            color = rules.opponent(color)
+        return board, color
+
+    def last_move(self, ply):
+        # The move that led to the position after the given ply, or None at the start.
+        return self.moves[ply - 1] if 0 < ply <= len(self.moves) else None
+
+    def to_text(self):
+        # Moves in long algebraic notation separated by spaces, as stored in the database.
+        return ' '.join(rules.move_to_uci(move) for move in self.moves)
+
+    @classmethod
+    def from_text(cls, text, start_fen=rules.START_FEN):
+        # Rebuild a history from the text produced by to_text().
+        history = cls(start_fen)
+        board, _ = rules.board_from_fen(start_fen)
+        for word in (text or '').split():
+            move = rules.parse_move(word)
+            rules.make_move(board, move)
+            history.append(move, board)
+        return history
+
+
+def move_list_rows(history):
+    # Group the moves into numbered rows like "1. e2e4 e7e5" for display.
+    # Each row is (move number, white move text, black move text or None).
+    rows = []
+    for index in range(0, len(history.moves), 2):
+        white = rules.move_to_uci(history.moves[index])
+        black = rules.move_to_uci(history.moves[index + 1]) if index + 1 < len(history.moves) else None
+        rows.append((index // 2 + 1, white, black))
+    return rows
+
+
+def load_game(cursor, game_id):
+    # Load the moves of a stored game from game_history.db, or None if it has none.
+    cursor.execute('SELECT moves FROM game_results WHERE id = ?', (game_id,))
+    result = cursor.fetchone()
+    if result is None or not result[0]:
+        return None
+    return MoveHistory.from_text(result[0])
@@ -0,0 +1,173 @@
+import atexit
+import contextlib
+import cProfile
+import json
+import time
+
+
+# Opt-in instrumentation for the game loop and the rules.
+# Everything here is a no-op until configure() is called with enabled=True,
+# so the normal game pays nothing more than a flag check.
+
+enabled = False      # Counters and timers are only recorded when this is True
+show_overlay = False  # Draw the FPS / move generation overlay on top of the board
+
+counters = {}        # name -> integer count
+timers = {}          # name -> [calls, total seconds, last seconds]
+frame_times = []     # Durations of the most recent frames, used for the FPS readout
+
+_profiler = None     # cProfile.Profile while a profiling session is running
+_profile_path = None
+_trace_path = None
+_trace_events = []   # Chrome trace events ("X" complete events) for the session
+_session_start = time.perf_counter()
+_last_frame = None
+_null_context = contextlib.nullcontext()
+
+MAX_FRAME_SAMPLES = 60
+MAX_TRACE_EVENTS = 500000
+
+
+def configure(enable=True, overlay=True, profile_path=None, trace_path=None):
+    # Turn instrumentation on and optionally start a cProfile / JSON trace session.
+    global enabled, show_overlay, _profiler, _profile_path, _trace_path, _session_start
+    enabled = enable
+    show_overlay = enable and overlay
+    _profile_path = profile_path
+    _trace_path = trace_path
+    _session_start = time.perf_counter()
+    if profile_path:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if profile_path or trace_path or enable:
+        # The game exits through sys.exit() from inside the event loop, so dump on exit
+        atexit.register(end_session)
+
+
+def count(name, amount=1):
+    # Increase a named counter.
+    if enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def record(name, start, duration):
+    # Store one timing sample for a named section.
+    timer = timers.get(name)
+    if timer is None:
+        timer = timers[name] = [0, 0.0, 0.0]
+    timer[0] += 1
+    timer[1] += duration
+    timer[2] = duration
+    if _trace_path and len(_trace_events) < MAX_TRACE_EVENTS:
+        _trace_events.append({
+            "name": name,
+            "ph": "X",
+            "ts": (start - _session_start) * 1e6,
+            "dur": duration * 1e6,
+            "pid": 0,
+            "tid": 0,
+        })
+
+
+@contextlib.contextmanager
+def _timed_section(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start, time.perf_counter() - start)
+
+
+def timed(name):
+    # Context manager that times the enclosed block under the given name.
+    if not enabled:
+        return _null_context
+    return _timed_section(name)
+
+
+def wrap(name, func, counter=None):
+    # Return a version of func that is timed under the given name.
+    # If counter is given, every call also increases that counter (e.g. "nodes").
+    def instrumented(*args, **kwargs):
+        if not enabled:
+            return func(*args, **kwargs)
+        if counter is not None:
+            counters[counter] = counters.get(counter, 0) + 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, start, time.perf_counter() - start)
+    instrumented.__name__ = func.__name__
+    instrumented.__wrapped__ = func
+    return instrumented
+
+
+def frame_tick():
+    # Call once per iteration of the game loop to track frame times.
+    global _last_frame
+    if not enabled:
+        return
+    now = time.perf_counter()
+    if _last_frame is not None:
+        frame_times.append(now - _last_frame)
+        if len(frame_times) > MAX_FRAME_SAMPLES:
+            del frame_times[0]
+        record("frame", _last_frame, now - _last_frame)
+    _last_frame = now
+
+
+def fps():
+    # Average frames per second over the recent frames.
+    if not frame_times:
+        return 0.0
+    return len(frame_times) / sum(frame_times)
+
+
+def last_time(name):
+    # Duration of the most recent sample of a timer in seconds.
+    timer = timers.get(name)
+    return timer[2] if timer else 0.0
+
+
+def draw_overlay(surface, font, position=(10, 40)):
+    # Draw the FPS, last move generation time and node count in the corner of the window.
+    if not show_overlay:
+        return
+    lines = [
+        f"FPS: {fps():.0f}",
+        f"Move gen: {last_time('move_gen') * 1000:.2f} ms",
+        f"Check test: {last_time('check_detection') * 1000:.2f} ms",
+        f"Render: {last_time('render') * 1000:.2f} ms",
+        f"Nodes: {counters.get('nodes', 0)}",
+    ]
+    x, y = position
+    for line in lines:
+        text_surface = font.render(line, True, (0, 0, 160), (255, 255, 255))
+        surface.blit(text_surface, (x, y))
+        y += text_surface.get_height() + 2
+
+
+def summary():
+    # Human readable table of all timers and counters.
+    lines = [f"{'section':<20}{'calls':>10}{'total ms':>12}{'avg us':>12}"]
+    for name, (calls, total, _) in sorted(timers.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<20}{calls:>10}{total * 1000:>12.2f}{total / calls * 1e6:>12.1f}")
+    for name, value in sorted(counters.items()):
+        lines.append(f"{name:<20}{value:>10}")
+    return "\n".join(lines)
+
+
+def end_session():
+    # Stop profiling and write the pstats dump and JSON trace if they were requested.
+    global _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_profile_path)
+        _profiler = None
+    if _trace_path:
+        with open(_trace_path, "w") as trace_file:
+            json.dump({"traceEvents": _trace_events,
+                       "otherData": {"counters": counters}}, trace_file)
+    if enabled and (timers or counters):
+        print(summary())
@@ -2,6 +2,35 @@ import pygame
 import sys
 import sqlite3
 import datetime
+import argparse
+import instrumentation
+import rules
+import history
+import engine
+import attacks
+import stats
+from rules import Board, King, Queen, Bishop, Knight, Rook, Pawn
+
+# Command line options for the optional profiling / instrumentation layer
+parser = argparse.ArgumentParser(description="Chess")
+parser.add_argument('--profile', action='store_true',
+                    help="Time move generation, check detection, rendering and saving, and show an overlay")
+parser.add_argument('--profile-output', metavar='FILE', help="Write a cProfile (pstats) dump of the session to FILE")
+parser.add_argument('--trace', metavar='FILE', help="Write a JSON trace (chrome://tracing format) of the session to FILE")
+args, _ = parser.parse_known_args()
+
+
+def add_instrumentation():
+    # Wrap move generation and check detection in the rules so they are counted and timed
+    for cls in [King, Queen, Bishop, Knight, Rook, Pawn]:
+        cls.get_valid_moves = instrumentation.wrap('get_valid_moves', cls.get_valid_moves, counter='nodes')
+    rules.is_in_check = instrumentation.wrap('is_in_check', rules.is_in_check)
+    rules.is_checkmate = instrumentation.wrap('check_detection', rules.is_checkmate)
+
+
+if args.profile or args.profile_output or args.trace:
+    instrumentation.configure(overlay=args.profile, profile_path=args.profile_output, trace_path=args.trace)
+    add_instrumentation()
 
 
 # Initialize Pygame modules
@@ -10,7 +39,8 @@ pygame.font.init()
 
 # Set up the display window dimensions
 screen_width, screen_height = (800, 800)
-screen = pygame.display.set_mode((screen_width, screen_height), pygame.RESIZABLE)
+panel_width = 200  # Width of the move list panel to the right of the board
+screen = pygame.display.set_mode((screen_width + panel_width, screen_height), pygame.RESIZABLE)
 pygame.display.set_caption("Chess")
 
 # Create or connect to a database
@@ -23,9 +53,16 @@ c.execute('''
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         winner TEXT,
         loser TEXT,
-        timestamp TEXT
+        timestamp TEXT,
+        moves TEXT
     )
 ''')
+# Databases created before moves were recorded don't have the moves column yet
+c.execute('PRAGMA table_info(game_results)')
+if 'moves' not in [column[1] for column in c.fetchall()]:
+    c.execute('ALTER TABLE game_results ADD COLUMN moves TEXT')
+# Running player totals and ratings, so the stats screen never scans game_results
+stats.create_tables(c)
 conn.commit()
 
 
@@ -42,18 +79,21 @@ def get_current_timestamp():
     return str(datetime.datetime.now())
 
 
-def save_game_result(game_id, winner, loser, timestamp):
-    c.execute('INSERT INTO game_results (id, winner, loser, timestamp) VALUES (?, ?, ?, ?)', (game_id, winner, loser, timestamp))
-    conn.commit()
+def save_game_result(game_id, winner, loser, timestamp, moves=None):
+    with instrumentation.timed('persistence'):
+        c.execute('INSERT INTO game_results (id, winner, loser, timestamp, moves) VALUES (?, ?, ?, ?, ?)',
+                  (game_id, winner, loser, timestamp, moves))
+        stats.record_game(c, winner, loser)
+        conn.commit()
 
 
-def save_simple_result(currentplayer, opponentplayer):
+def save_simple_result(currentplayer, opponentplayer, moves=None):
     # Generate the necessary parameters for save_game_result
     game_id = generate_game_id()  # Generate a unique game ID
     timestamp = get_current_timestamp()  # Get the current timestamp
 
     # Call the original save_game_result function with all required parameters
-    save_game_result(game_id, currentplayer, opponentplayer,  timestamp)
+    save_game_result(game_id, currentplayer, opponentplayer,  timestamp, moves)
 
 # Move these variables to the module level
 promotion_pending = False  # Flag to indicate if a pawn promotion is pending
@@ -78,20 +118,32 @@ Whitepieces = [
     pygame.image.load(r'C:\Users\arong\OneDrive\Desktop\Computer Science\Project\Game\Images\White_King.svg')
 ]
 
+# Index of each piece type in the Blackpieces / Whitepieces lists
+piece_image_index = {'P': 0, 'R': 1, 'N': 2, 'B': 3, 'Q': 4, 'K': 5}
+
+
+def attach_images(board):
+    # Give every piece on a board built by the rules (e.g. from a FEN) its image.
+    for row in board:
+        for piece in row:
+            if piece is not None:
+                images = Whitepieces if piece.color == 'white' else Blackpieces
+                piece.image = images[piece_image_index[piece.letter]]
+
 
 # noinspection PyUnresolvedReferences,PyTypeChecker
-def startgame(auto_promotes):
+def startgame(auto_promotes, review_game=None):
     global promotion_pending, promoting_pawn  # Declare globals
-    en_passant_target = None  # Variable to track en passant target square
 
     # Set up the board
     board_size = 8  # Chessboard is 8x8 squares
     square_size = screen_width // board_size  # Size of each square on the board
     board_colors = [pygame.Color("lightgrey"), pygame.Color("azure4")]  # Colors for the squares
-    board = [[None for _ in range(board_size)] for _ in range(board_size)]  # Initialize empty board
+    board = Board()  # Initialize empty board (also tracks the en passant target square)
     
     # Font for displaying messages
     message_font = pygame.font.SysFont(None, 36)
+    overlay_font = pygame.font.SysFont(None, 22)  # Font for the profiling overlay
 
     # Keep track of the current player ('white' or 'black')
     current_player = 'white'
@@ -101,406 +153,6 @@ def startgame(auto_promotes):
     game_over = False  # Flag to indicate if the game has ended
     check_status = False  # Flag to indicate if the current player is in check
 
-    # noinspection PyShadowingNames
-    class Piece:
-        # Base class for all chess pieces.
-        def __init__(self, color, position, image):
-            self.color = color  # 'white' or 'black'
-            self.position = position  # Tuple (row, col)
-            self.image = image  # Image of the piece
-
-        def move(self, new_position):
-            self.position = new_position  # Update the piece's position
-
-        def get_valid_moves(self, board):
-            # Return a list of valid moves for this piece.
-            raise NotImplementedError("This method should be overridden in each piece subclass.")
-
-    class King(Piece):
-        # Class representing the King piece.
-        def __init__(self, color, position, symbol):
-            super().__init__(color, position, symbol)
-            self.has_moved = False  # To track if the king has moved (for castling)
-
-        def move(self, new_position):
-            # Update the king's position and set has_moved to True.
-            super().move(new_position)
-            self.has_moved = True
-
-
-        def get_valid_moves(self, board):
-            row, col = self.position
-            # Possible directions the King can move (one square in any direction)
-            directions = [(-1, -1), (-1, 0), (-1, 1),
-                          (0, -1),          (0, 1),
-                          (1, -1),  (1, 0),  (1, 1)]
-            moves = []
-            for delta_row, delta_col in directions:
-                new_row, new_col = row + delta_row, col + delta_col
-                # Check if new position is within the board limits
-                if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                    target_piece = board[new_row][new_col]
-                    # Check if the target square is empty or has an opponent's piece
-                    if target_piece is None or target_piece.color != self.color:
-                        moves.append((new_row, new_col))
-
-            # Castling moves
-            if not self.has_moved and not is_square_under_attack(row, col, self.color, board):
-                # King-side castling
-                if self.can_castle_short(board):
-                    moves.append((row, col + 2))
-                # Queen-side castling
-                if self.can_castle_long(board):
-                    moves.append((row, col - 2))
-
-            # Filter out moves that would put the king in check
-            valid_moves = []
-            for move in moves:
-                if not would_cause_check(self, move, board):
-                    valid_moves.append(move)
-
-            return valid_moves
-
-        def can_castle_short(self, board):
-            # Check if short (king-side) castling is possible.
-            row, col = self.position
-            rook_col = 7
-            # Check if the squares between king and rook are empty
-            if all(board[row][col_index] is None for col_index in range(col + 1, rook_col)):
-                rook = board[row][rook_col]
-                if isinstance(rook, Rook) and rook.color == self.color and not rook.has_moved:
-                    # Ensure squares king passes through are not under attack
-                    for col_index in range(col + 1, col + 3):
-                        if is_square_under_attack(row, col_index, self.color, board):
-                            return False
-                    return True
-            return False
-
-        def can_castle_long(self, board):
-            # Check if long (queen-side) castling is possible.
-            row, col = self.position
-            rook_col = 0
-            # Check if the squares between king and rook are empty
-            if all(board[row][col_index] is None for col_index in range(rook_col + 1, col)):
-                rook = board[row][rook_col]
-                if isinstance(rook, Rook) and rook.color == self.color and not rook.has_moved:
-                    # Ensure squares king passes through are not under attack
-                    for col_index in range(col - 2, col):
-                        if is_square_under_attack(row, col_index, self.color, board):
-                            return False
-                    return True
-            return False
-
-    class Queen(Piece):
-        # Class representing the Queen piece.
-        def get_valid_moves(self, board):
-            row, col = self.position
-            # Possible directions the Queen can move (any number of squares in any direction)
-            directions = [(-1, -1), (-1, 0), (-1, 1),
-                          (0, -1),          (0, 1),
-                          (1, -1),  (1, 0),  (1, 1)]
-            moves = []
-            for delta_row, delta_col in directions:
-                new_row, new_col = row, col
-                while True:
-                    new_row += delta_row
-                    new_col += delta_col
-                    # Check if new position is within the board limits
-                    if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                        target_piece = board[new_row][new_col]
-                        if target_piece is None:
-                            # The square is empty; add to valid moves
-                            moves.append((new_row, new_col))
-                        elif target_piece.color != self.color:
-                            # The square has an opponent's piece; add to valid moves and stop in this direction
-                            moves.append((new_row, new_col))
-                            break
-                        else:
-                            # The square has a friendly piece; stop in this direction
-                            break
-                    else:
-                        # Out of board bounds; stop in this direction
-                        break
-
-            # Filter out moves that would put the king in check
-            valid_moves = []
-            for move in moves:
-                if not would_cause_check(self, move, board):
-                    valid_moves.append(move)
-
-            return valid_moves
-
-    class Bishop(Piece):
-        # Class representing the Bishop piece.
-        def get_valid_moves(self, board):
-            row, col = self.position
-            # Possible directions the Bishop can move (diagonally any number of squares)
-            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-            moves = []
-            for delta_row, delta_col in directions:
-                new_row, new_col = row, col
-                while True:
-                    new_row += delta_row
-                    new_col += delta_col
-                    # Check if new position is within the board limits
-                    if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                        target_piece = board[new_row][new_col]
-                        if target_piece is None:
-                            moves.append((new_row, new_col))
-                        elif target_piece.color != self.color:
-                            moves.append((new_row, new_col))
-                            break
-                        else:
-                            break
-                    else:
-                        break
-
-            # Filter out moves that would put the king in check
-            valid_moves = []
-            for move in moves:
-                if not would_cause_check(self, move, board):
-                    valid_moves.append(move)
-            return valid_moves
-
-    class Knight(Piece):
-        # Class representing the Knight piece.
-        def get_valid_moves(self, board):
-            row, col = self.position
-            # Possible moves for the Knight (L-shaped moves)
-            moves = [(-2, -1), (-2, 1),
-                     (-1, -2), (-1, 2),
-                     (1, -2),  (1, 2),
-                     (2, -1),  (2, 1)]
-            potential_moves = []
-            for delta_row, delta_col in moves:
-                new_row, new_col = row + delta_row, col + delta_col
-                if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                    target_piece = board[new_row][new_col]
-                    if target_piece is None or target_piece.color != self.color:
-                        potential_moves.append((new_row, new_col))
-
-            # Filter out moves that would put the king in check
-            valid_moves = []
-            for move in potential_moves:
-                if not would_cause_check(self, move, board):
-                    valid_moves.append(move)
-
-            return valid_moves
-
-    class Rook(Piece):
-        # Class representing the Rook piece.
-        def __init__(self, color, position, symbol):
-            super().__init__(color, position, symbol)
-            self.has_moved = False  # To track if the rook has moved (for castling)
-
-        def move(self, new_position):
-            # Update the rook's position and set has_moved to True.
-            super().move(new_position)
-            self.has_moved = True
-
-        def get_valid_moves(self, board):
-            row, col = self.position
-            # Possible directions the Rook can move (vertical and horizontal any number of squares)
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            moves = []
-            for delta_row, delta_col in directions:
-                new_row, new_col = row, col
-                while True:
-                    new_row += delta_row
-                    new_col += delta_col
-                    if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                        target_piece = board[new_row][new_col]
-                        if target_piece is None:
-                            moves.append((new_row, new_col))
-                        elif target_piece.color != self.color:
-                            moves.append((new_row, new_col))
-                            break
-                        else:
-                            break
-                    else:
-                        break
-
-            # Filter out moves that would put the king in check
-            valid_moves = []
-            for move in moves:
-                if not would_cause_check(self, move, board):
-                    valid_moves.append(move)
-            return valid_moves
-
-    class Pawn(Piece):
-        # Class representing the Pawn piece.
-        def get_valid_moves(self, board):
-            row, col = self.position
-            direction = -1 if self.color == 'white' else 1
-            start_row = 6 if self.color == 'white' else 1
-            moves = []
-
-            # Move forward one square
-            if 0 <= row + direction < board_size and board[row + direction][col] is None:
-                moves.append((row + direction, col))
-                # Move forward two squares from starting position
-                if row == start_row and board[row + 2 * direction][col] is None:
-                    moves.append((row + 2 * direction, col))
-
-            # Capture diagonally and en passant
-            for delta_col in [-1, 1]:
-                new_row, new_col = row + direction, col + delta_col
-                if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                    target_piece = board[new_row][new_col]
-                    if target_piece is not None and target_piece.color != self.color:
-                        moves.append((new_row, new_col))
-                    # Check for en passant capture
-                    elif en_passant_target == (new_row, new_col):
-                        moves.append((new_row, new_col))
-
-            # Filter out moves that would put the king in check
-            valid_moves = []
-            for move in moves:
-                if not would_cause_check(self, move, board):
-                    valid_moves.append(move)
-            return valid_moves
-
-        def move(self, new_position):
-            # Move the pawn to a new position, and handle promotion if reaching the opposite end.
-            super().move(new_position)
-            row, col = self.position
-            # Check for promotion
-            if (self.color == 'white' and row == 0) or (self.color == 'black' and row == 7):
-                # Use 'global' to modify module-level variables
-                global promotion_pending, promoting_pawn
-                promotion_pending = True
-                promoting_pawn = self
-
-    def is_square_under_attack(row, col, color, board):
-        # Check if a square is under attack by any of the opponent's pieces.
-        opponent_color = 'black' if color == 'white' else 'white'
-        for row_index in range(board_size):
-            for col_index in range(board_size):
-                piece = board[row_index][col_index]
-                if piece is not None and piece.color == opponent_color:
-                    if isinstance(piece, King):
-                        # King's moves are limited to one square
-                        if abs(piece.position[0] - row) <= 1 and abs(piece.position[1] - col) <= 1:
-                            return True
-                    else:
-                        if (row, col) in piece.get_potential_moves(board):
-                            return True
-        return False
-
-    def would_cause_check(piece, move, board):
-        # Determine if moving a piece to a new position would leave its own king in check.
-        original_position = piece.position
-        target_piece = board[move[0]][move[1]]
-
-        # Temporarily make the move
-        board[original_position[0]][original_position[1]] = None
-        board[move[0]][move[1]] = piece
-        piece.position = move
-
-        in_check = is_in_check(piece.color, board)
-
-        # Undo the move
-        piece.position = original_position
-        board[original_position[0]][original_position[1]] = piece
-        board[move[0]][move[1]] = target_piece
-        return in_check
-
-    def is_in_check(color, board):
-        # Check if the king of the given color is in check.
-        for row in range(board_size):
-            for col in range(board_size):
-                piece = board[row][col]
-                if isinstance(piece, King) and piece.color == color:
-                    return is_square_under_attack(row, col, color, board)
-        return False
-
-    def is_checkmate(color, board):
-        # Check if the player of the given color is in checkmate.
-        if not is_in_check(color, board):
-            return False
-        # For each piece of the current player, check if there are any valid moves
-        for row in range(board_size):
-            for col in range(board_size):
-                piece = board[row][col]
-                if piece is not None and piece.color == color:
-                    if piece.get_valid_moves(board):
-                        return False
-        return True
-
-    def add_potential_moves_method():
-        # Adds a get_potential_moves method to each piece class
-        for cls in [King, Queen, Bishop, Knight, Rook, Pawn]:
-            if cls == King:
-                def get_potential_moves(self, board):
-                    row, col = self.position
-                    directions = [(-1, -1), (-1, 0), (-1, 1),
-                                  (0, -1),          (0, 1),
-                                  (1, -1),  (1, 0),  (1, 1)]
-                    moves = []
-                    for delta_row, delta_col in directions:
-                        new_row, new_col = row + delta_row, col + delta_col
-                        if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                            moves.append((new_row, new_col))
-                    return moves
-                cls.get_potential_moves = get_potential_moves
-            elif cls == Knight:
-                def get_potential_moves(self, board):
-                    row, col = self.position
-                    moves = [(-2, -1), (-2, 1),
-                             (-1, -2), (-1, 2),
-                             (1, -2),  (1, 2),
-                             (2, -1),  (2, 1)]
-                    potential_moves = []
-                    for delta_row, delta_col in moves:
-                        new_row, new_col = row + delta_row, col + delta_col
-                        if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                            potential_moves.append((new_row, new_col))
-                    return potential_moves
-                cls.get_potential_moves = get_potential_moves
-            elif cls == Pawn:
-                def get_potential_moves(self, board):
-                    row, col = self.position
-                    direction = -1 if self.color == 'white' else 1
-                    moves = []
-                    # Capture diagonally
-                    for delta_col in [-1, 1]:
-                        new_row, new_col = row + direction, col + delta_col
-                        if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                            moves.append((new_row, new_col))
-                    # En passant target
-                    if en_passant_target:
-                        en_row, en_col = en_passant_target
-                        if abs(en_col - col) == 1 and en_row - row == direction:
-                            moves.append(en_passant_target)
-                    return moves
-                cls.get_potential_moves = get_potential_moves
-            else:
-                def get_potential_moves(self, board):
-                    global directions
-                    row, col = self.position
-                    if isinstance(self, Bishop):
-                        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-                    elif isinstance(self, Rook):
-                        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-                    elif isinstance(self, Queen):
-                        directions = [(-1, -1), (-1, 0), (-1, 1),
-                                      (0, -1),          (0, 1),
-                                      (1, -1),  (1, 0),  (1, 1)]
-                    moves = []
-                    for delta_row, delta_col in directions:
-                        new_row, new_col = row, col
-                        while True:
-                            new_row += delta_row
-                            new_col += delta_col
-                            if 0 <= new_row < board_size and 0 <= new_col < board_size:
-                                moves.append((new_row, new_col))
-                                if board[new_row][new_col] is not None:
-                                    break
-                            else:
-                                break
-                    return moves
-                cls.get_potential_moves = get_potential_moves
-
     # Initialize the pieces on the board
     # noinspection PyTypeChecker
     def initialize_pieces():
@@ -529,197 +181,339 @@ def startgame(auto_promotes):
         board[7][6] = Knight('white', (7, 6), Whitepieces[2])
         board[7][7] = Rook('white', (7, 7), Whitepieces[1])
 
-    add_potential_moves_method()
     initialize_pieces()
 
+    # Move history for going back and forward through the game
+    move_history = review_game if review_game is not None else history.MoveHistory()
+    ply = 0  # How many moves of move_history the board is currently showing
+    review_mode = review_game is not None  # Reviewing a stored game, so no moves can be played
+    result_saved = False  # The result is only saved once, even if the ending is replayed
+    pending_move = None  # Start and end squares of a move waiting for the promotion choice
+
+    # Layout of the move list panel
+    move_list_font = pygame.font.SysFont(None, 24)
+    move_list_top, move_list_row_height = 50, 24
+    visible_rows = (screen_height - move_list_top - 160) // move_list_row_height
+
+    # Background analysis, toggled with the A key
+    analyzer = engine.Analyzer()
+    analysis_mode = False
+
+    # Attack counts for every square, updated after each move; used to mark hanging pieces (H key)
+    attack_map = attacks.AttackMap(board)
+    show_hanging = False
+
     def get_square_color(row, col):
         # Return the color of the square at the given position.
         return board_colors[(row + col) % 2]
 
+    def record_move(move):
+        # Add a move played on the board to the history, dropping any moves after it
+        nonlocal ply
+        move_history.truncate(ply)
+        move_history.append(move, board)
+        ply = len(move_history)
+
+    def save_result(winner, loser):
+        # Save the finished game together with its moves so it can be reviewed later
+        nonlocal result_saved
+        if not result_saved and not review_mode:
+            save_simple_result(winner, loser, move_history.to_text())
+            result_saved = True
+
+    def seek(target_ply):
+        # Show the position after target_ply moves, rebuilt from the nearest keyframe
+        nonlocal board, ply, current_player, selected_piece, valid_moves, game_over, check_status, attack_map
+        global promotion_pending, promoting_pawn
+        ply = max(0, min(target_ply, len(move_history)))
+        board, current_player = move_history.position_at(ply)
+        attach_images(board)
+        attack_map = attacks.AttackMap(board)
+        selected_piece = None
+        valid_moves = []
+        promotion_pending = False
+        promoting_pawn = None
+        game_over = rules.is_checkmate(current_player, board)
+        check_status = not game_over and rules.is_in_check(current_player, board)
+
+    def first_visible_row():
+        # Scroll the move list so the current move is always visible
+        current_row = max(ply - 1, 0) // 2
+        return max(0, current_row - visible_rows + 1)
+
+    def move_list_click(mouse_pos):
+        # Jump to the move that was clicked in the move list panel
+        row_index = first_visible_row() + (mouse_pos[1] - move_list_top) // move_list_row_height
+        if mouse_pos[1] < move_list_top or row_index * 2 >= len(move_history):
+            return
+        x = mouse_pos[0] - screen_width
+        if x >= 120 and row_index * 2 + 1 < len(move_history):
+            seek(row_index * 2 + 2)  # Black's move
+        elif x >= 45:
+            seek(row_index * 2 + 1)  # White's move
+
+    def draw_move_list():
+        # Draw the numbered move list to the right of the board, highlighting the current move
+        pygame.draw.rect(screen, pygame.Color('gray95'), pygame.Rect(screen_width, 0, panel_width, screen_height))
+        title = "Review" if review_mode else "Moves"
+        screen.blit(move_list_font.render(title, True, pygame.Color('black')), (screen_width + 10, 15))
+        first_row = first_visible_row()
+        rows = history.move_list_rows(move_history)[first_row:first_row + visible_rows]
+        for index, (number, white_move, black_move) in enumerate(rows):
+            y = move_list_top + index * move_list_row_height
+            row_ply = (first_row + index) * 2
+            for text, x, text_ply in ((f"{number}.", 10, None), (white_move, 45, row_ply + 1),
+                                      (black_move, 120, row_ply + 2)):
+                if text is None:
+                    continue
+                if text_ply == ply:
+                    highlight_rect = pygame.Rect(screen_width + x - 4, y - 3, 70, move_list_row_height - 2)
+                    pygame.draw.rect(screen, pygame.Color('yellow'), highlight_rect)
+                screen.blit(move_list_font.render(text, True, pygame.Color('black')), (screen_width + x, y))
+        hint = "Esc: back" if review_mode else "Left/Right, Home/End"
+        screen.blit(move_list_font.render(hint, True, pygame.Color('gray40')), (screen_width + 10, screen_height - 30))
+        if not analysis_mode:
+            screen.blit(move_list_font.render("A: analysis, H: hanging", True, pygame.Color('gray40')),
+                        (screen_width + 10, screen_height - 54))
+
+    def draw_analysis():
+        # Draw the evaluation bar on the right edge of the panel and the best line under the move list
+        result = analyzer.latest()
+        score = result[1] if result is not None else 0
+        bar_x = screen_width + panel_width - 10
+        white_height = int(screen_height * engine.white_share(score))
+        pygame.draw.rect(screen, pygame.Color('gray20'), pygame.Rect(bar_x, 0, 10, screen_height - white_height))
+        pygame.draw.rect(screen, pygame.Color('white'),
+                         pygame.Rect(bar_x, screen_height - white_height, 10, white_height))
+
+        lines = ["Analysing..."]
+        if result is not None:
+            depth, score, pv, _ = result
+            if score > engine.MATE_THRESHOLD:
+                score_text = f"M{(engine.MATE_SCORE - score + 1) // 2}"
+            elif score < -engine.MATE_THRESHOLD:
+                score_text = f"-M{(engine.MATE_SCORE + score + 1) // 2}"
+            else:
+                score_text = f"{score / 100:+.2f}"
+            pv_text = [rules.move_to_uci(move) for move in pv]
+            lines = [f"Depth {depth}  {score_text}"]
+            # Three moves of the principal variation per line
+            lines += [' '.join(pv_text[index:index + 3]) for index in range(0, min(len(pv_text), 9), 3)]
+        for index, line in enumerate(lines):
+            screen.blit(move_list_font.render(line, True, pygame.Color('darkblue')),
+                        (screen_width + 10, screen_height - 140 + index * 22))
+
+    if review_mode:
+        seek(0)
+
     # Game loop
     running = True
     while running:
+        instrumentation.frame_tick()
         # Handle events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                # User clicked the close button
-                running = False
-                pygame.quit()
-                sys.exit()
-            elif promotion_pending:
-                row, col = promoting_pawn.position
-                if auto_promotes:
-                    board[row][col] = Queen(promoting_pawn.color, promoting_pawn.position,
-                                            Whitepieces[4] if promoting_pawn.color == 'white' else Blackpieces[4])
-                    promoting_pawn = None
-                    promotion_pending = False
-                    current_player = 'black' if current_player == 'white' else 'white'
-                #Handle promotion choice
-                elif event.type == pygame.KEYDOWN:
-                    key = event.unicode.upper()
-                    if key in ['Q', 'R', 'B', 'N']:
-                        if key == 'Q':
-                            board[row][col] = Queen(promoting_pawn.color, promoting_pawn.position,
-                                                    Whitepieces[4] if promoting_pawn.color == 'white' else Blackpieces[4])
-                        elif key == 'R':
-                            board[row][col] = Rook(promoting_pawn.color, promoting_pawn.position,
-                                                   Whitepieces[1] if promoting_pawn.color == 'white' else Blackpieces[1])
-                        elif key == 'B':
-                            board[row][col] = Bishop(promoting_pawn.color, promoting_pawn.position,
-                                                     Whitepieces[3] if promoting_pawn.color == 'white' else Blackpieces[3])
-                        elif key == 'N':
-                            board[row][col] = Knight(promoting_pawn.color, promoting_pawn.position,
-                                                     Whitepieces[2] if promoting_pawn.color == 'white' else Blackpieces[2])
-
+        with instrumentation.timed('events'):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    # User clicked the close button
+                    running = False
+                    pygame.quit()
+                    sys.exit()
+                elif promotion_pending:
+                    row, col = promoting_pawn.position
+                    if auto_promotes:
+                        board[row][col] = Queen(promoting_pawn.color, promoting_pawn.position,
+                                                Whitepieces[4] if promoting_pawn.color == 'white' else Blackpieces[4])
+                        attack_map.update(board, [(row, col)])
+                        record_move(pending_move + ('q',))
                         promoting_pawn = None
                         promotion_pending = False
-                        # Switch turns after promotion
                         current_player = 'black' if current_player == 'white' else 'white'
-                        opponent_player = 'black' if current_player == 'white' else 'white'
-                        # Check for check or checkmate after promotion
-                        if is_checkmate(current_player, board):
-                            game_over = True
-                            save_simple_result(opponent_player, current_player)
-                            break
-                        else:
-                            check_status = is_in_check(current_player, board)
-            elif event.type == pygame.MOUSEBUTTONDOWN and not game_over and not promotion_pending:
-                # Handle mouse click event
-                mouse_pos = pygame.mouse.get_pos()
-                clicked_row = mouse_pos[1] // square_size
-                clicked_col = mouse_pos[0] // square_size
-
-                if 0 <= clicked_row < board_size and 0 <= clicked_col < board_size:
-                    clicked_piece = board[clicked_row][clicked_col]
-                    if selected_piece is None:
-                        # No piece selected yet
-                        if clicked_piece is not None and clicked_piece.color == current_player:
-                            # Select the piece
-                            selected_piece = clicked_piece
-                            valid_moves = selected_piece.get_valid_moves(board)
-                            if not valid_moves:
-                                selected_piece = None  # Deselect if no valid moves
-                    else:
-                        # A piece is already selected
-                        if (clicked_row, clicked_col) in valid_moves:
-                            # Special handling for castling
-                            if isinstance(selected_piece, King) and abs(selected_piece.position[1] - clicked_col) == 2:
-                                # Determine the direction of castling
-                                if clicked_col > selected_piece.position[1]:
-                                    # King-side castling
-                                    rook_col = 7
-                                    new_rook_col = clicked_col - 1
-                                else:
-                                    # Queen-side castling
-                                    rook_col = 0
-                                    new_rook_col = clicked_col + 1
-                                # Move the rook
-                                rook = board[selected_piece.position[0]][rook_col]
-                                board[selected_piece.position[0]][rook_col] = None
-                                rook.move((selected_piece.position[0], new_rook_col))
-                                board[selected_piece.position[0]][new_rook_col] = rook
-
-                            # Move the selected piece to the clicked square
-                            old_row, old_col = selected_piece.position
-                            board[old_row][old_col] = None  # Remove piece from old position
-
-                            # Check for en passant capture
-                            if isinstance(selected_piece, Pawn):
-                                if (clicked_row, clicked_col) == en_passant_target:
-                                    # En passant capture
-                                    capture_row = clicked_row + (1 if selected_piece.color == 'white' else -1)
-                                    board[capture_row][clicked_col] = None  # Remove the opponent's pawn
-
-                            # Capture opponent's piece if present
-                            if board[clicked_row][clicked_col] is not None:
-                                board[clicked_row][clicked_col] = None
-
-                            # Update piece position
-                            selected_piece.move((clicked_row, clicked_col))
-                            board[clicked_row][clicked_col] = selected_piece
-
-                            # After moving, reset en passant target
-                            en_passant_target = None
-
-                            # If pawn moved two squares, set en passant target
-                            if isinstance(selected_piece, Pawn) and abs(clicked_row - old_row) == 2:
-                                en_passant_target = ((old_row + clicked_row) // 2, clicked_col)
+                    #Handle promotion choice
+                    elif event.type == pygame.KEYDOWN:
+                        key = event.unicode.upper()
+                        if key in ['Q', 'R', 'B', 'N']:
+                            if key == 'Q':
+                                board[row][col] = Queen(promoting_pawn.color, promoting_pawn.position,
+                                                        Whitepieces[4] if promoting_pawn.color == 'white' else Blackpieces[4])
+                            elif key == 'R':
+                                board[row][col] = Rook(promoting_pawn.color, promoting_pawn.position,
+                                                       Whitepieces[1] if promoting_pawn.color == 'white' else Blackpieces[1])
+                            elif key == 'B':
+                                board[row][col] = Bishop(promoting_pawn.color, promoting_pawn.position,
+                                                         Whitepieces[3] if promoting_pawn.color == 'white' else Blackpieces[3])
+                            elif key == 'N':
+                                board[row][col] = Knight(promoting_pawn.color, promoting_pawn.position,
+                                                         Whitepieces[2] if promoting_pawn.color == 'white' else Blackpieces[2])
+
+                            attack_map.update(board, [(row, col)])
+                            record_move(pending_move + (key.lower(),))
+                            promoting_pawn = None
+                            promotion_pending = False
+                            # Switch turns after promotion
+                            current_player = 'black' if current_player == 'white' else 'white'
+                            opponent_player = 'black' if current_player == 'white' else 'white'
+                            # Check for check or checkmate after promotion
+                            if rules.is_checkmate(current_player, board):
+                                game_over = True
+                                save_result(opponent_player, current_player)
+                                break
                             else:
-                                en_passant_target = None
-
-                            # Reset selection
-                            selected_piece = None
-                            valid_moves = []
-
-                            # If promotion is pending, don't switch turns yet
-                            if not promotion_pending:
-                                # Switch turns
-                                current_player = 'black' if current_player == 'white' else 'white'
-                                opponent_player = 'black' if current_player == 'white' else 'white'
-                                # Check if the next player is in check or checkmate
-                                if is_checkmate(current_player, board):
-                                    game_over = True
-                                    save_simple_result(opponent_player, current_player)
-                                else:
-                                    check_status = is_in_check(current_player, board)
-                        elif clicked_piece is not None and clicked_piece.color == current_player:
-                            # Select a different piece of the current player
-                            selected_piece = clicked_piece
-                            valid_moves = selected_piece.get_valid_moves(board)
-                            if not valid_moves:
-                                selected_piece = None  # Deselect if no valid moves
+                                check_status = rules.is_in_check(current_player, board)
+                elif event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFT, pygame.K_RIGHT,
+                                                                    pygame.K_HOME, pygame.K_END):
+                    # Step back and forward through the move history
+                    if event.key == pygame.K_LEFT:
+                        seek(ply - 1)
+                    elif event.key == pygame.K_RIGHT:
+                        seek(ply + 1)
+                    elif event.key == pygame.K_HOME:
+                        seek(0)
+                    else:
+                        seek(len(move_history))
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_a:
+                    # Turn the background analysis on or off
+                    analysis_mode = not analysis_mode
+                    if not analysis_mode:
+                        analyzer.stop()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                    # Show or hide the pieces that can be won
+                    show_hanging = not show_hanging
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE and review_mode:
+                    # Leave the review and go back to the history screen
+                    analyzer.stop()
+                    return
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.pos[0] >= screen_width:
+                    # Click in the move list panel
+                    move_list_click(event.pos)
+                elif event.type == pygame.MOUSEBUTTONDOWN and not game_over and not promotion_pending and not review_mode:
+                    # Handle mouse click event
+                    mouse_pos = pygame.mouse.get_pos()
+                    clicked_row = mouse_pos[1] // square_size
+                    clicked_col = mouse_pos[0] // square_size
+
+                    if 0 <= clicked_row < board_size and 0 <= clicked_col < board_size:
+                        clicked_piece = board[clicked_row][clicked_col]
+                        if selected_piece is None:
+                            # No piece selected yet
+                            if clicked_piece is not None and clicked_piece.color == current_player:
+                                # Select the piece
+                                selected_piece = clicked_piece
+                                with instrumentation.timed('move_gen'):
+                                    valid_moves = selected_piece.get_valid_moves(board)
+                                if not valid_moves:
+                                    selected_piece = None  # Deselect if no valid moves
                         else:
-                            # Deselect the piece
-                            selected_piece = None
-                            valid_moves = []
-
-        # Clear the screen
-        screen.fill(pygame.Color("white"))
+                            # A piece is already selected
+                            if (clicked_row, clicked_col) in valid_moves:
+                                # Play the move; castling, en passant and captures are handled by the rules
+                                move_start = selected_piece.position
+                                undo = rules.make_move(board, (move_start, (clicked_row, clicked_col), None))
+                                attack_map.update(board, rules.changed_squares(undo))
+
+                                # Check for promotion
+                                if isinstance(selected_piece, Pawn) and clicked_row in (0, board_size - 1):
+                                    promotion_pending = True
+                                    promoting_pawn = selected_piece
+                                    pending_move = (move_start, (clicked_row, clicked_col))
+
+                                # Reset selection
+                                selected_piece = None
+                                valid_moves = []
+
+                                # If promotion is pending, don't switch turns yet
+                                if not promotion_pending:
+                                    record_move((move_start, (clicked_row, clicked_col), None))
+                                    # Switch turns
+                                    current_player = 'black' if current_player == 'white' else 'white'
+                                    opponent_player = 'black' if current_player == 'white' else 'white'
+                                    # Check if the next player is in check or checkmate
+                                    if rules.is_checkmate(current_player, board):
+                                        game_over = True
+                                        save_result(opponent_player, current_player)
+                                    else:
+                                        check_status = rules.is_in_check(current_player, board)
+                            elif clicked_piece is not None and clicked_piece.color == current_player:
+                                # Select a different piece of the current player
+                                selected_piece = clicked_piece
+                                with instrumentation.timed('move_gen'):
+                                    valid_moves = selected_piece.get_valid_moves(board)
+                                if not valid_moves:
+                                    selected_piece = None  # Deselect if no valid moves
+                            else:
+                                # Deselect the piece
+                                selected_piece = None
+                                valid_moves = []
+
+        # Keep the analysis following the position on the board
+        if analysis_mode and not promotion_pending:
+            analyzer.analyze(board, current_player)
+
+        # Draw the frame
+        with instrumentation.timed('render'):
+            # Clear the screen
+            screen.fill(pygame.Color("white"))
     
-        # Draw the board and pieces
-        for row in range(board_size):
-            for col in range(board_size):
-                # Draw the square
-                square_color = get_square_color(row, col)
-                square_rect = pygame.Rect(col * square_size, row * square_size, square_size, square_size)
-                pygame.draw.rect(screen, square_color, square_rect)
-
-                # Highlight valid moves
-                if selected_piece is not None and (row, col) in valid_moves:
-                    # Draw a green circle on squares that are valid moves
-                    pygame.draw.circle(screen, pygame.Color('green'),
-                                       (col * square_size + square_size // 2, row * square_size + square_size // 2),
-                                       square_size // 6)
-
-                # Highlight selected piece
-                if selected_piece is not None and selected_piece.position == (row, col):
-                    # Draw a yellow border around the selected piece
-                    pygame.draw.rect(screen, pygame.Color('yellow'), square_rect, 3)
-
-                # Draw the piece if there is one
-                piece = board[row][col]
-                if piece is not None:
-                    # Scale the piece image to fit in the square
-                    scaled_image = pygame.transform.scale(piece.image, (square_size -1  , square_size ))
-                    screen.blit(scaled_image, square_rect.topleft)
-
-        # Display check or checkmate message
-        if game_over:
-            message = f"Checkmate! { 'Black' if current_player == 'white' else 'White' } wins!"
-            text_surface = message_font.render(message, True, pygame.Color('red'))
-            text_rect = text_surface.get_rect(center=(screen_width // 2, screen_height // 2))
-            screen.blit(text_surface, text_rect)
-        elif check_status:
-            message = "Check!"
-            text_surface = message_font.render(message, True, pygame.Color('red'))
-            screen.blit(text_surface, (10, 10))
-
-        # Display promotion message
-        if promotion_pending:
-            message = f"Promote pawn to (Q)ueen, (R)ook, (B)ishop, or K(N)ight?"
-            text_surface = message_font.render(message, True, pygame.Color('blue'))
-            text_rect = text_surface.get_rect(center=(screen_width // 2, screen_height // 2))
-            screen.blit(text_surface, text_rect)
+            # Draw the board and pieces
+            for row in range(board_size):
+                for col in range(board_size):
+                    # Draw the square
+                    square_color = get_square_color(row, col)
+                    square_rect = pygame.Rect(col * square_size, row * square_size, square_size, square_size)
+                    pygame.draw.rect(screen, square_color, square_rect)
+
+                    # Highlight valid moves
+                    if selected_piece is not None and (row, col) in valid_moves:
+                        # Draw a green circle on squares that are valid moves
+                        pygame.draw.circle(screen, pygame.Color('green'),
+                                           (col * square_size + square_size // 2, row * square_size + square_size // 2),
+                                           square_size // 6)
+
+                    # Highlight selected piece
+                    if selected_piece is not None and selected_piece.position == (row, col):
+                        # Draw a yellow border around the selected piece
+                        pygame.draw.rect(screen, pygame.Color('yellow'), square_rect, 3)
+
+                    # Draw the piece if there is one
+                    piece = board[row][col]
+                    if piece is not None:
+                        # Scale the piece image to fit in the square
+                        scaled_image = pygame.transform.scale(piece.image, (square_size -1  , square_size ))
+                        screen.blit(scaled_image, square_rect.topleft)
+
+            # Circle the pieces that are attacked and can be won by the opponent
+            if show_hanging:
+                for piece in attacks.hanging_pieces(board, attack_map):
+                    hanging_row, hanging_col = piece.position
+                    pygame.draw.circle(screen, pygame.Color('red'),
+                                       (hanging_col * square_size + square_size // 2,
+                                        hanging_row * square_size + square_size // 2),
+                                       square_size // 2 - 2, 3)
+
+            # Draw the move list panel
+            draw_move_list()
+            if analysis_mode:
+                draw_analysis()
+
+            # Display check or checkmate message
+            if game_over:
+                message = f"Checkmate! { 'Black' if current_player == 'white' else 'White' } wins!"
+                text_surface = message_font.render(message, True, pygame.Color('red'))
+                text_rect = text_surface.get_rect(center=(screen_width // 2, screen_height // 2))
+                screen.blit(text_surface, text_rect)
+            elif check_status:
+                message = "Check!"
+                text_surface = message_font.render(message, True, pygame.Color('red'))
+                screen.blit(text_surface, (10, 10))
+
+            # Display promotion message
+            if promotion_pending:
+                message = f"Promote pawn to (Q)ueen, (R)ook, (B)ishop, or K(N)ight?"
+                text_surface = message_font.render(message, True, pygame.Color('blue'))
+                text_rect = text_surface.get_rect(center=(screen_width // 2, screen_height // 2))
+                screen.blit(text_surface, text_rect)
+
+        # Draw the profiling overlay (only shown when started with --profile)
+        instrumentation.draw_overlay(screen, overlay_font)
 
         # Update the display
         pygame.display.flip()
@@ -775,36 +569,85 @@ def settings_menu():
 
 
 def game_history():
-    # Fill the screen with white color
-    screen.fill((255, 255, 255))
     # Set the font and render the "Previous games" text
     font = pygame.font.Font(None, 36)
     text = font.render("Previous games", True, (0, 0, 0))
     text_rect = text.get_rect(center=(screen.get_width() // 2, screen.get_height() // 2 - 100))
-    screen.blit(text, text_rect)
 
-    # Fetch and display past game results
-    c.execute('SELECT winner, loser, timestamp FROM game_results')
+    # Fetch past game results
+    c.execute('SELECT id, winner, loser, timestamp, moves FROM game_results')
     game_results = c.fetchall()
-    y_offset = 50
-    for result in game_results:
-        winner, loser, timestamp = result
-        result_text = f"Winner: {winner}, Loser: {loser}, Time: {timestamp}"
-        result_render = font.render(result_text, True, (0, 0, 0))
-        screen.blit(result_render, (50, screen.get_height() // 2 - 50 + y_offset))
-        y_offset += 40
 
-    pygame.display.flip()
+    def draw_history():
+        # Fill the screen with white color and display the past game results
+        screen.fill((255, 255, 255))
+        screen.blit(text, text_rect)
+        result_rects = []
+        y_offset = 50
+        for game_id, winner, loser, timestamp, moves in game_results:
+            result_text = f"Winner: {winner}, Loser: {loser}, Time: {timestamp}"
+            # Games with recorded moves can be clicked to review them
+            result_render = font.render(result_text, True, (0, 0, 160) if moves else (0, 0, 0))
+            result_rect = screen.blit(result_render, (50, screen.get_height() // 2 - 50 + y_offset))
+            result_rects.append((result_rect, game_id))
+            y_offset += 40
+        pygame.display.flip()
+        return result_rects
+
+    result_rects = draw_history()
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 # Quit the game if the user closes the window
                 pygame.quit()
                 sys.exit()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                # Review the game that was clicked, if its moves were recorded
+                for result_rect, game_id in result_rects:
+                    if result_rect.collidepoint(event.pos):
+                        review_game = history.load_game(c, game_id)
+                        if review_game is not None:
+                            startgame(True, review_game)
+                            result_rects = draw_history()
+                        break
             elif event.type == pygame.KEYDOWN:
                 # Return to the main menu if any key is pressed
                 return
 
+def stats_screen():
+    # Show every player's record and rating, read from the running totals in player_stats
+    font = pygame.font.Font(None, 36)
+    small_font = pygame.font.Font(None, 28)
+    text = font.render("Player statistics", True, (0, 0, 0))
+    text_rect = text.get_rect(center=(screen.get_width() // 2, 60))
+    players = stats.all_players(c)
+
+    screen.fill((255, 255, 255))
+    screen.blit(text, text_rect)
+    header = "Player        Games   W   L   D   Streak   Best   Rating"
+    screen.blit(small_font.render(header, True, (80, 80, 80)), (50, 110))
+    y_offset = 150
+    for player, games, wins, losses, draws, current_streak, best_streak, rating in players:
+        # Show the current streak as e.g. W3 or L2
+        streak = f"W{current_streak}" if current_streak > 0 else f"L{-current_streak}" if current_streak < 0 else "-"
+        stats_text = (f"{player:<12}  {games:>5}  {wins:>3} {losses:>3} {draws:>3}   {streak:>6}   "
+                      f"{best_streak:>4}   {rating:>6.0f}")
+        screen.blit(small_font.render(stats_text, True, (0, 0, 0)), (50, y_offset))
+        y_offset += 35
+    if not players:
+        screen.blit(small_font.render("No games played yet", True, (0, 0, 0)), (50, y_offset))
+    pygame.display.flip()
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                # Quit the game if the user closes the window
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
+                # Return to the main menu on any key or click
+                return
+
 def main_menu():
     # Fill the screen with white color
     screen.fill((255, 255, 255))
@@ -815,10 +658,12 @@ def main_menu():
     start_button_rect = pygame.Rect((screen.get_width() // 2 - button_width // 2, screen.get_height() // 2 - 60), (button_width, button_height))
     settings_button_rect = pygame.Rect((screen.get_width() // 2 - button_width // 2, screen.get_height() // 2 + 10), (button_width, button_height))
     history_button_rect = pygame.Rect((screen.get_width() // 2 - button_width // 2, screen.get_height() // 2 + 80), (button_width, button_height))
+    stats_button_rect = pygame.Rect((screen.get_width() // 2 - button_width // 2, screen.get_height() // 2 + 150), (button_width, button_height))
     # Render the button texts
     start_text = font.render("Start Game", True, (0, 0, 0))
     settings_text = font.render("Settings", True, (0, 0, 0))
     history_text = font.render("History", True, (0, 0, 0))
+    stats_text = font.render("Stats", True, (0, 0, 0))
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -841,14 +686,20 @@ def main_menu():
                     game_history()
                     screen.fill((255, 255, 255))
                     break
+                elif stats_button_rect.collidepoint(mouse_pos):
+                    stats_screen()
+                    screen.fill((255, 255, 255))
+                    break
         # Draw the buttons
         pygame.draw.rect(screen, (200, 200, 200), start_button_rect)
         pygame.draw.rect(screen, (200, 200, 200), settings_button_rect)
         pygame.draw.rect(screen, (200, 200, 200), history_button_rect)
+        pygame.draw.rect(screen, (200, 200, 200), stats_button_rect)
         # Draw the button texts
         screen.blit(start_text, (start_button_rect.x + (button_width - start_text.get_width()) // 2, start_button_rect.y + (button_height - start_text.get_height()) // 2))
         screen.blit(settings_text, (settings_button_rect.x + (button_width - settings_text.get_width()) // 2, settings_button_rect.y + (button_height - settings_text.get_height()) // 2))
         screen.blit(history_text, (history_button_rect.x + (button_width - history_text.get_width()) // 2, history_button_rect.y + (button_height - history_text.get_height()) // 2))
+        screen.blit(stats_text, (stats_button_rect.x + (button_width - stats_text.get_width()) // 2, stats_button_rect.y + (button_height - stats_text.get_height()) // 2))
         pygame.display.flip()
 
 # Start the main menu
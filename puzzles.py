@@ -0,0 +1,229 @@
+import argparse
+import concurrent.futures
+import time
+
+import rules
+
+
+# Mate-in-N puzzle solver using depth-first proof-number search (df-pn).
+# Every node is scored from the side to move's point of view with two numbers:
+# phi, an estimate of how many leaves must be expanded to prove the side to move
+# wins, and delta, the same for proving it loses. "Wins" for the attacker means
+# delivering mate within N moves; for the defender it means surviving. The search
+# always expands the most promising child and only returns when its thresholds are
+# exceeded, so it uses memory only for the transposition table, which is capped.
+
+INFINITY = 10 ** 9
+DEFAULT_TABLE_SIZE = 1 << 18
+
+
+class MateSolver:
+    def __init__(self, table_size=DEFAULT_TABLE_SIZE):
+        self.table = {}  # (position hash, attacker moves left) -> (phi, delta)
+        self.table_size = table_size
+        self.nodes = 0
+
+    def store(self, key, phi, delta):
+        # Save a node's proof numbers. Updated entries move to the end of the table, so when
+        # it is full the tenth that was stored least recently is dropped.
+        if self.table.pop(key, None) is None and len(self.table) >= self.table_size:
+            for old_key in list(self.table)[:max(self.table_size // 10, 1)]:
+                del self.table[old_key]
+        self.table[key] = (phi, delta)
+
+    def lookup(self, key):
+        return self.table.get(key, (1, 1))
+
+    def terminal(self, board, color, attacker, moves_left, moves):
+        # Proof numbers of a node that needs no search, or None if it has to be expanded.
+        if not moves:
+            if color == attacker or not rules.is_in_check(color, board):
+                # The attacker is stuck, or the defender is stalemated: no mate
+                return (INFINITY, 0) if color == attacker else (0, INFINITY)
+            return INFINITY, 0  # The defender is checkmated
+        if color == attacker and moves_left == 0:
+            return INFINITY, 0  # Out of moves without delivering mate
+        return None
+
+    def children(self, board, color, attacker, moves_left):
+        # Legal moves with the table key of the position each one leads to.
+        child_moves_left = moves_left - 1 if color == attacker else moves_left
+        opponent = rules.opponent(color)
+        result = []
+        for move in rules.generate_moves(color, board):
+            undo = rules.make_move(board, move)
+            result.append((move, (rules.position_hash(board, opponent), child_moves_left)))
+            rules.undo_move(board, undo)
+        return result
+
+    def mid(self, board, color, attacker, moves_left, threshold_phi, threshold_delta):
+        # Expand the node until its phi or delta reaches its threshold.
+        self.nodes += 1
+        key = (rules.position_hash(board, color), moves_left)
+        phi, delta = self.lookup(key)
+        if phi >= threshold_phi or delta >= threshold_delta:
+            return phi, delta
+
+        if color != attacker and moves_left == 0:
+            # The attacker has used all their moves, so only an immediate mate counts
+            phi, delta = (INFINITY, 0) if rules.is_checkmate(color, board) else (0, INFINITY)
+            self.store(key, phi, delta)
+            return phi, delta
+        moves = self.children(board, color, attacker, moves_left)
+        result = self.terminal(board, color, attacker, moves_left, moves)
+        if result is not None:
+            self.store(key, *result)
+            return result
+
+        opponent = rules.opponent(color)
+        while True:
+            # phi is the best child's delta; delta is the sum of the children's phi
+            phi, delta = INFINITY, 0
+            best, best_child, second_delta = None, None, INFINITY
+            for move, child_key in moves:
+                child_phi, child_delta = self.lookup(child_key)
+                delta = min(delta + child_phi, INFINITY)
+                if child_delta < phi:
+                    second_delta = phi
+                    phi, best, best_child = child_delta, move, (child_phi, child_delta)
+                elif child_delta < second_delta:
+                    second_delta = child_delta
+            if phi >= threshold_phi or delta >= threshold_delta:
+                self.store(key, phi, delta)
+                return phi, delta
+
+            child_phi, child_delta = best_child
+            child_threshold_phi = min(threshold_delta - delta + child_phi, INFINITY)
+            child_threshold_delta = min(threshold_phi, second_delta + 1)
+            undo = rules.make_move(board, best)
+            try:
+                self.mid(board, opponent, attacker, moves_left - (1 if color == attacker else 0),
+                         child_threshold_phi, child_threshold_delta)
+            finally:
+                rules.undo_move(board, undo)
+
+    def prove(self, board, color, moves):
+        # True if the side to move can force mate within the given number of moves.
+        phi, _ = self.mid(board, color, color, moves, INFINITY, INFINITY)
+        return phi == 0
+
+    def mate_length(self, board, color, attacker, limit):
+        # Fewest attacker moves (at most limit) needed to force mate from this node, or None.
+        # Table entries are keyed by the moves left, so every length has its own entries.
+        for moves_left in range(1 if color == attacker else 0, limit + 1):
+            phi, delta = self.mid(board, color, attacker, moves_left, INFINITY, INFINITY)
+            if (phi if color == attacker else delta) == 0:
+                return moves_left
+        return None
+
+    def mating_line(self, board, color, moves):
+        # The moves of a proven mate: the attacker plays towards the quickest mate and
+        # the defender picks the reply that holds out longest.
+        attacker = color
+        line = []
+        undos = []
+        moves_left = moves
+        while not (color != attacker and rules.is_checkmate(color, board)):
+            opponent = rules.opponent(color)
+            child_limit = moves_left - 1 if color == attacker else moves_left
+            chosen, chosen_length = None, None
+            for move in rules.generate_moves(color, board):
+                undo = rules.make_move(board, move)
+                length = self.mate_length(board, opponent, attacker, child_limit)
+                rules.undo_move(board, undo)
+                if length is None:
+                    continue
+                if chosen is None or (length < chosen_length if color == attacker else length > chosen_length):
+                    chosen, chosen_length = move, length
+            if chosen is None:
+                break
+            line.append(chosen)
+            undos.append(rules.make_move(board, chosen))
+            color = opponent
+            moves_left = chosen_length
+        for undo in reversed(undos):
+            rules.undo_move(board, undo)
+        return line
+
+
+def solve(fen, moves, table_size=DEFAULT_TABLE_SIZE):
+    # Look for a mate in at most the given number of moves. Shorter mates are tried first,
+    # so the line returned is a shortest one. Returns (mate length or None, line, nodes).
+    board, color = rules.board_from_fen(fen)
+    solver = MateSolver(table_size)
+    for depth in range(1, moves + 1):
+        if solver.prove(board, color, depth):
+            return depth, solver.mating_line(board, color, depth), solver.nodes
+    return None, [], solver.nodes
+
+
+def solve_puzzle(puzzle):
+    # Worker for the process pool: solve one (fen, moves) puzzle and time it.
+    fen, moves, table_size = puzzle
+    start = time.perf_counter()
+    depth, line, nodes = solve(fen, moves, table_size)
+    return fen, moves, depth, line, nodes, time.perf_counter() - start
+
+
+def read_puzzles(path):
+    # Puzzle files have one "FEN;N" per line; blank lines and lines starting with # are skipped.
+    puzzles = []
+    with open(path) as puzzle_file:
+        for line in puzzle_file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fen, moves = line.rsplit(';', 1)
+            puzzles.append((fen.strip(), int(moves)))
+    return puzzles
+
+
+def solve_batch(puzzles, workers=None, table_size=DEFAULT_TABLE_SIZE):
+    # Solve many puzzles across a process pool, printing each result and a summary.
+    start = time.perf_counter()
+    solved = total_nodes = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [(fen, moves, table_size) for fen, moves in puzzles]
+        for fen, moves, depth, line, nodes, seconds in pool.map(solve_puzzle, jobs):
+            total_nodes += nodes
+            if depth is not None:
+                solved += 1
+                print(f"mate in {depth}: {' '.join(rules.move_to_uci(move) for move in line)}  ({fen})")
+            else:
+                print(f"no mate in {moves}  ({fen})")
+    elapsed = time.perf_counter() - start
+    print("===========================")
+    print(f"Puzzles solved  : {solved}/{len(puzzles)}")
+    print(f"Total time (s)  : {elapsed:.2f}")
+    print(f"Positions/second: {int(total_nodes / elapsed) if elapsed > 0 else 0}")
+    print(f"Puzzles/minute  : {solved / elapsed * 60 if elapsed > 0 else 0:.1f}")
+    return solved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve mate-in-N chess puzzles with df-pn search")
+    parser.add_argument('fen', nargs='?', help="Position to solve")
+    parser.add_argument('moves', nargs='?', type=int, default=2, help="Maximum number of moves for the mate")
+    parser.add_argument('--batch', metavar='FILE', help="Solve every 'FEN;N' line of FILE")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes for --batch")
+    parser.add_argument('--table-size', type=int, default=DEFAULT_TABLE_SIZE,
+                        help="Maximum number of transposition table entries per search")
+    args = parser.parse_args()
+
+    if args.batch:
+        solve_batch(read_puzzles(args.batch), args.workers, args.table_size)
+    elif args.fen:
+        start = time.perf_counter()
+        depth, line, nodes = solve(args.fen, args.moves, args.table_size)
+        elapsed = time.perf_counter() - start
+        if depth is None:
+            print(f"No mate in {args.moves}")
+        else:
+            print(f"Mate in {depth}: {' '.join(rules.move_to_uci(move) for move in line)}")
+        print(f"{nodes} positions in {elapsed:.2f}s ({int(nodes / elapsed) if elapsed > 0 else 0} positions/second)")
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
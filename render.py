@@ -0,0 +1,190 @@
+import os
+
+# Render without opening a window; this has to be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import concurrent.futures
+import math
+import sqlite3
+import time
+
+import pygame
+
+import history
+import rules
+
+
+# Headless board renderer for thumbnails and reports.
+# Positions from a file of FENs or the games in game_history.db are drawn to PNG
+# files without a window. Each renderer draws the empty board and scales the piece
+# images once, so a board is just a copy of the background, up to 32 blits and an
+# optional arrow for the last move. Large batches are spread over a process pool,
+# with one renderer per worker process.
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Images')
+piece_names = {'P': 'Pawn', 'R': 'Rook', 'N': 'Knight', 'B': 'Bishop', 'Q': 'Queen', 'K': 'King'}
+board_colors = [pygame.Color("lightgrey"), pygame.Color("azure4")]  # Same colors as the game window
+arrow_color = pygame.Color(255, 140, 0, 170)
+DEFAULT_SIZE = 256
+
+
+class BoardRenderer:
+    def __init__(self, size=DEFAULT_SIZE):
+        pygame.display.init()
+        if pygame.display.get_surface() is None:
+            # convert() needs a display surface, even a dummy one
+            pygame.display.set_mode((1, 1))
+        self.square_size = size // rules.board_size
+        self.size = self.square_size * rules.board_size
+
+        # The empty board is drawn once and copied for every position
+        self.background = pygame.Surface((self.size, self.size)).convert()
+        for row in range(rules.board_size):
+            for col in range(rules.board_size):
+                square_rect = pygame.Rect(col * self.square_size, row * self.square_size,
+                                          self.square_size, self.square_size)
+                pygame.draw.rect(self.background, board_colors[(row + col) % 2], square_rect)
+
+        # Piece images are loaded and scaled to the square size once
+        self.pieces = {}
+        for color in ('white', 'black'):
+            for letter, name in piece_names.items():
+                image = pygame.image.load(os.path.join(IMAGE_DIR, f"{color.capitalize()}_{name}.svg"))
+                self.pieces[(color, letter)] = pygame.transform.smoothscale(
+                    image.convert_alpha(), (self.square_size, self.square_size))
+
+        # Transparent layer the arrow is drawn on, so it is blended over the pieces
+        self.overlay = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
+
+    def square_centre(self, square):
+        row, col = square
+        return (col * self.square_size + self.square_size / 2, row * self.square_size + self.square_size / 2)
+
+    def draw_arrow(self, surface, move):
+        # Draw an arrow from the start square to the end square of the move.
+        start, end, _ = move
+        start_x, start_y = self.square_centre(start)
+        end_x, end_y = self.square_centre(end)
+        angle = math.atan2(end_y - start_y, end_x - start_x)
+        head_length = self.square_size * 0.45
+        head_width = self.square_size * 0.3
+        # The shaft stops where the head begins, so the two don't overlap
+        base_x = end_x - head_length * math.cos(angle)
+        base_y = end_y - head_length * math.sin(angle)
+        normal_x, normal_y = -math.sin(angle), math.cos(angle)
+
+        self.overlay.fill((0, 0, 0, 0))
+        pygame.draw.line(self.overlay, arrow_color, (start_x, start_y), (base_x, base_y),
+                         max(self.square_size // 6, 1))
+        pygame.draw.polygon(self.overlay, arrow_color, [
+            (end_x, end_y),
+            (base_x + normal_x * head_width, base_y + normal_y * head_width),
+            (base_x - normal_x * head_width, base_y - normal_y * head_width),
+        ])
+        surface.blit(self.overlay, (0, 0))
+
+    def render(self, board, last_move=None):
+        # Return a new surface with the position drawn on it.
+        surface = self.background.copy()
+        for row in range(rules.board_size):
+            for col in range(rules.board_size):
+                piece = board[row][col]
+                if piece is not None:
+                    surface.blit(self.pieces[(piece.color, piece.letter)],
+                                 (col * self.square_size, row * self.square_size))
+        if last_move is not None:
+            self.draw_arrow(surface, last_move)
+        return surface
+
+    def save(self, board, path, last_move=None):
+        pygame.image.save(self.render(board, last_move), path)
+
+
+# Each worker process builds its own renderer once, when the pool starts it
+worker_renderer = None
+
+
+def start_worker(size):
+    global worker_renderer
+    worker_renderer = BoardRenderer(size)
+
+
+def render_job(job):
+    # Worker for the process pool: draw one (output path, FEN, last move or None) job.
+    path, fen, last_move = job
+    board, _ = rules.board_from_fen(fen)
+    worker_renderer.save(board, path, rules.parse_move(last_move) if last_move else None)
+    return path
+
+
+def fen_jobs(path, output):
+    # One job per FEN line of the file; blank lines and lines starting with # are skipped.
+    # A line may end with ";move" (e.g. ";e2e4") to draw that move as the last move.
+    jobs = []
+    with open(path) as fen_file:
+        for line in fen_file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fen, _, last_move = line.partition(';')
+            jobs.append((os.path.join(output, f"position_{len(jobs) + 1:05d}.png"), fen.strip(),
+                         last_move.strip() or None))
+    return jobs
+
+
+def game_jobs(database, output):
+    # One job per stored game with recorded moves: its final position and last move.
+    conn = sqlite3.connect(database)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(game_results)")
+    if 'moves' not in [column[1] for column in cursor.fetchall()]:
+        conn.close()
+        return []
+    jobs = []
+    cursor.execute("SELECT id, moves FROM game_results WHERE moves IS NOT NULL AND moves != '' ORDER BY id")
+    for game_id, moves in cursor:
+        game = history.MoveHistory.from_text(moves)
+        board, color = game.position_at(len(game))
+        last_move = game.last_move(len(game))
+        jobs.append((os.path.join(output, f"game_{game_id}.png"), rules.board_to_fen(board, color),
+                     rules.move_to_uci(last_move) if last_move else None))
+    conn.close()
+    return jobs
+
+
+def render_batch(jobs, size=DEFAULT_SIZE, workers=None, arrows=True):
+    # Render every job across a process pool and print how fast it went.
+    if not arrows:
+        jobs = [(path, fen, None) for path, fen, _ in jobs]
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=start_worker,
+                                                initargs=(size,)) as pool:
+        # Hand the jobs out in chunks so the workers aren't waiting on the pool for each board
+        chunk_size = max(len(jobs) // ((workers or os.cpu_count() or 1) * 4), 1)
+        rendered = sum(1 for _ in pool.map(render_job, jobs, chunksize=chunk_size))
+    elapsed = time.perf_counter() - start
+    print(f"Boards rendered : {rendered}")
+    print(f"Total time (s)  : {elapsed:.2f}")
+    print(f"Boards/minute   : {rendered / elapsed * 60 if elapsed > 0 else 0:.0f}")
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render chess positions to PNG images without a window")
+    parser.add_argument('output', help="Directory for the PNG files")
+    parser.add_argument('--fens', metavar='FILE', help="Render every 'FEN[;last move]' line of FILE")
+    parser.add_argument('--database', default='game_history.db',
+                        help="Render the final position of every stored game (used when --fens is not given)")
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE, help="Width and height of each image in pixels")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--no-arrows', action='store_true', help="Don't draw an arrow for the last move")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    jobs = fen_jobs(args.fens, args.output) if args.fens else game_jobs(args.database, args.output)
+    render_batch(jobs, args.size, args.workers, not args.no_arrows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,703 @@
+import random
+
+
+# The rules of chess, independent of the pygame window.
+# Boards are 8x8 lists indexed board[row][col]; row 0 is black's back rank (rank 8)
+# and col 0 is the a-file. Moves are tuples (start, end, promotion) where start and end
+# are (row, col) tuples and promotion is one of 'q', 'r', 'b', 'n' or None.
+
+board_size = 8  # Chessboard is 8x8 squares
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class Board(list):
+    # An 8x8 grid of pieces that also remembers the en passant target square.
+    def __init__(self):
+        super().__init__([None for _ in range(board_size)] for _ in range(board_size))
+        self.en_passant_target = None  # Square a pawn can capture onto en passant, or None
+
+
+# noinspection PyShadowingNames
+class Piece:
+    # Base class for all chess pieces.
+    letter = None  # FEN letter of the piece (upper case)
+    value = 0      # Material value in centipawns
+
+    def __init__(self, color, position, image=None):
+        self.color = color  # 'white' or 'black'
+        self.position = position  # Tuple (row, col)
+        self.image = image  # Image of the piece (only used by the pygame window)
+
+    def move(self, new_position):
+        self.position = new_position  # Update the piece's position
+
+    def get_valid_moves(self, board):
+        # Return a list of valid moves for this piece.
+        raise NotImplementedError("This method should be overridden in each piece subclass.")
+
+
+class King(Piece):
+    # Class representing the King piece.
+    letter = 'K'
+    value = 0
+
+    def __init__(self, color, position, symbol=None):
+        super().__init__(color, position, symbol)
+        self.has_moved = False  # To track if the king has moved (for castling)
+
+    def move(self, new_position):
+        # Update the king's position and set has_moved to True.
+        super().move(new_position)
+        self.has_moved = True
+
+    def get_valid_moves(self, board):
+        row, col = self.position
+        # Possible directions the King can move (one square in any direction)
+        directions = [(-1, -1), (-1, 0), (-1, 1),
+                      (0, -1),          (0, 1),
+                      (1, -1),  (1, 0),  (1, 1)]
+        moves = []
+        for delta_row, delta_col in directions:
+            new_row, new_col = row + delta_row, col + delta_col
+            # Check if new position is within the board limits
+            if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                target_piece = board[new_row][new_col]
+                # Check if the target square is empty or has an opponent's piece
+                if target_piece is None or target_piece.color != self.color:
+                    moves.append((new_row, new_col))
+
+        # Castling moves
+        if not self.has_moved and not is_square_under_attack(row, col, self.color, board):
+            # King-side castling
+            if self.can_castle_short(board):
+                moves.append((row, col + 2))
+            # Queen-side castling
+            if self.can_castle_long(board):
+                moves.append((row, col - 2))
+
+        # Filter out moves that would put the king in check
+        valid_moves = []
+        for move in moves:
+            if not would_cause_check(self, move, board):
+                valid_moves.append(move)
+
+        return valid_moves
+
+    def can_castle_short(self, board):
+        # Check if short (king-side) castling is possible.
+        row, col = self.position
+        rook_col = 7
+        # Check if the squares between king and rook are empty
+        if all(board[row][col_index] is None for col_index in range(col + 1, rook_col)):
+            rook = board[row][rook_col]
+            if isinstance(rook, Rook) and rook.color == self.color and not rook.has_moved:
+                # Ensure squares king passes through are not under attack
+                for col_index in range(col + 1, col + 3):
+                    if is_square_under_attack(row, col_index, self.color, board):
+                        return False
+                return True
+        return False
+
+    def can_castle_long(self, board):
+        # Check if long (queen-side) castling is possible.
+        row, col = self.position
+        rook_col = 0
+        # Check if the squares between king and rook are empty
+        if all(board[row][col_index] is None for col_index in range(rook_col + 1, col)):
+            rook = board[row][rook_col]
+            if isinstance(rook, Rook) and rook.color == self.color and not rook.has_moved:
+                # Ensure squares king passes through are not under attack
+                for col_index in range(col - 2, col):
+                    if is_square_under_attack(row, col_index, self.color, board):
+                        return False
+                return True
+        return False
+
+
+class Queen(Piece):
+    # Class representing the Queen piece.
+    letter = 'Q'
+    value = 900
+
+    def get_valid_moves(self, board):
+        row, col = self.position
+        # Possible directions the Queen can move (any number of squares in any direction)
+        directions = [(-1, -1), (-1, 0), (-1, 1),
+                      (0, -1),          (0, 1),
+                      (1, -1),  (1, 0),  (1, 1)]
+        moves = []
+        for delta_row, delta_col in directions:
+            new_row, new_col = row, col
+            while True:
+                new_row += delta_row
+                new_col += delta_col
+                # Check if new position is within the board limits
+                if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                    target_piece = board[new_row][new_col]
+                    if target_piece is None:
+                        # The square is empty; add to valid moves
+                        moves.append((new_row, new_col))
+                    elif target_piece.color != self.color:
+                        # The square has an opponent's piece; add to valid moves and stop in this direction
+                        moves.append((new_row, new_col))
+                        break
+                    else:
+                        # The square has a friendly piece; stop in this direction
+                        break
+                else:
+                    # Out of board bounds; stop in this direction
+                    break
+
+        # Filter out moves that would put the king in check
+        valid_moves = []
+        for move in moves:
+            if not would_cause_check(self, move, board):
+                valid_moves.append(move)
+
+        return valid_moves
+
+
+class Bishop(Piece):
+    # Class representing the Bishop piece.
+    letter = 'B'
+    value = 330
+
+    def get_valid_moves(self, board):
+        row, col = self.position
+        # Possible directions the Bishop can move (diagonally any number of squares)
+        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+        moves = []
+        for delta_row, delta_col in directions:
+            new_row, new_col = row, col
+            while True:
+                new_row += delta_row
+                new_col += delta_col
+                # Check if new position is within the board limits
+                if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                    target_piece = board[new_row][new_col]
+                    if target_piece is None:
+                        moves.append((new_row, new_col))
+                    elif target_piece.color != self.color:
+                        moves.append((new_row, new_col))
+                        break
+                    else:
+                        break
+                else:
+                    break
+
+        # Filter out moves that would put the king in check
+        valid_moves = []
+        for move in moves:
+            if not would_cause_check(self, move, board):
+                valid_moves.append(move)
+        return valid_moves
+
+
+class Knight(Piece):
+    # Class representing the Knight piece.
+    letter = 'N'
+    value = 320
+
+    def get_valid_moves(self, board):
+        row, col = self.position
+        # Possible moves for the Knight (L-shaped moves)
+        moves = [(-2, -1), (-2, 1),
+                 (-1, -2), (-1, 2),
+                 (1, -2),  (1, 2),
+                 (2, -1),  (2, 1)]
+        potential_moves = []
+        for delta_row, delta_col in moves:
+            new_row, new_col = row + delta_row, col + delta_col
+            if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                target_piece = board[new_row][new_col]
+                if target_piece is None or target_piece.color != self.color:
+                    potential_moves.append((new_row, new_col))
+
+        # Filter out moves that would put the king in check
+        valid_moves = []
+        for move in potential_moves:
+            if not would_cause_check(self, move, board):
+                valid_moves.append(move)
+
+        return valid_moves
+
+
+class Rook(Piece):
+    # Class representing the Rook piece.
+    letter = 'R'
+    value = 500
+
+    def __init__(self, color, position, symbol=None):
+        super().__init__(color, position, symbol)
+        self.has_moved = False  # To track if the rook has moved (for castling)
+
+    def move(self, new_position):
+        # Update the rook's position and set has_moved to True.
+        super().move(new_position)
+        self.has_moved = True
+
+    def get_valid_moves(self, board):
+        row, col = self.position
+        # Possible directions the Rook can move (vertical and horizontal any number of squares)
+        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        moves = []
+        for delta_row, delta_col in directions:
+            new_row, new_col = row, col
+            while True:
+                new_row += delta_row
+                new_col += delta_col
+                if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                    target_piece = board[new_row][new_col]
+                    if target_piece is None:
+                        moves.append((new_row, new_col))
+                    elif target_piece.color != self.color:
+                        moves.append((new_row, new_col))
+                        break
+                    else:
+                        break
+                else:
+                    break
+
+        # Filter out moves that would put the king in check
+        valid_moves = []
+        for move in moves:
+            if not would_cause_check(self, move, board):
+                valid_moves.append(move)
+        return valid_moves
+
+
+class Pawn(Piece):
+    # Class representing the Pawn piece.
+    letter = 'P'
+    value = 100
+
+    def get_valid_moves(self, board):
+        row, col = self.position
+        direction = -1 if self.color == 'white' else 1
+        start_row = 6 if self.color == 'white' else 1
+        moves = []
+
+        # Move forward one square
+        if 0 <= row + direction < board_size and board[row + direction][col] is None:
+            moves.append((row + direction, col))
+            # Move forward two squares from starting position
+            if row == start_row and board[row + 2 * direction][col] is None:
+                moves.append((row + 2 * direction, col))
+
+        # Capture diagonally and en passant
+        for delta_col in [-1, 1]:
+            new_row, new_col = row + direction, col + delta_col
+            if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                target_piece = board[new_row][new_col]
+                if target_piece is not None and target_piece.color != self.color:
+                    moves.append((new_row, new_col))
+                # Check for en passant capture
+                elif board.en_passant_target == (new_row, new_col):
+                    moves.append((new_row, new_col))
+
+        # Filter out moves that would put the king in check
+        valid_moves = []
+        for move in moves:
+            if not would_cause_check(self, move, board):
+                valid_moves.append(move)
+        return valid_moves
+
+
+piece_classes = {'K': King, 'Q': Queen, 'B': Bishop, 'N': Knight, 'R': Rook, 'P': Pawn}
+
+
+def is_square_under_attack(row, col, color, board):
+    # Check if a square is under attack by any of the opponent's pieces.
+    opponent_color = 'black' if color == 'white' else 'white'
+    for row_index in range(board_size):
+        for col_index in range(board_size):
+            piece = board[row_index][col_index]
+            if piece is not None and piece.color == opponent_color:
+                if isinstance(piece, King):
+                    # King's moves are limited to one square
+                    if abs(piece.position[0] - row) <= 1 and abs(piece.position[1] - col) <= 1:
+                        return True
+                else:
+                    if (row, col) in piece.get_potential_moves(board):
+                        return True
+    return False
+
+
+def would_cause_check(piece, move, board):
+    # Determine if moving a piece to a new position would leave its own king in check.
+    original_position = piece.position
+    target_piece = board[move[0]][move[1]]
+
+    # An en passant capture also removes the pawn beside the moving pawn
+    en_passant_square = None
+    if isinstance(piece, Pawn) and target_piece is None and move == board.en_passant_target:
+        en_passant_square = (original_position[0], move[1])
+    en_passant_piece = board[en_passant_square[0]][en_passant_square[1]] if en_passant_square else None
+
+    # Temporarily make the move
+    board[original_position[0]][original_position[1]] = None
+    board[move[0]][move[1]] = piece
+    if en_passant_square:
+        board[en_passant_square[0]][en_passant_square[1]] = None
+    piece.position = move
+
+    in_check = is_in_check(piece.color, board)
+
+    # Undo the move
+    piece.position = original_position
+    board[original_position[0]][original_position[1]] = piece
+    board[move[0]][move[1]] = target_piece
+    if en_passant_square:
+        board[en_passant_square[0]][en_passant_square[1]] = en_passant_piece
+    return in_check
+
+
+def is_in_check(color, board):
+    # Check if the king of the given color is in check.
+    for row in range(board_size):
+        for col in range(board_size):
+            piece = board[row][col]
+            if isinstance(piece, King) and piece.color == color:
+                return is_square_under_attack(row, col, color, board)
+    return False
+
+
+def is_checkmate(color, board):
+    # Check if the player of the given color is in checkmate.
+    if not is_in_check(color, board):
+        return False
+    return not has_legal_moves(color, board)
+
+
+def has_legal_moves(color, board):
+    # Check if any piece of the given color has at least one valid move.
+    for row in range(board_size):
+        for col in range(board_size):
+            piece = board[row][col]
+            if piece is not None and piece.color == color:
+                if piece.get_valid_moves(board):
+                    return True
+    return False
+
+
+def add_potential_moves_method():
+    # Adds a get_potential_moves method to each piece class
+    for cls in [King, Queen, Bishop, Knight, Rook, Pawn]:
+        if cls == King:
+            def get_potential_moves(self, board):
+                row, col = self.position
+                directions = [(-1, -1), (-1, 0), (-1, 1),
+                              (0, -1),          (0, 1),
+                              (1, -1),  (1, 0),  (1, 1)]
+                moves = []
+                for delta_row, delta_col in directions:
+                    new_row, new_col = row + delta_row, col + delta_col
+                    if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                        moves.append((new_row, new_col))
+                return moves
+            cls.get_potential_moves = get_potential_moves
+        elif cls == Knight:
+            def get_potential_moves(self, board):
+                row, col = self.position
+                moves = [(-2, -1), (-2, 1),
+                         (-1, -2), (-1, 2),
+                         (1, -2),  (1, 2),
+                         (2, -1),  (2, 1)]
+                potential_moves = []
+                for delta_row, delta_col in moves:
+                    new_row, new_col = row + delta_row, col + delta_col
+                    if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                        potential_moves.append((new_row, new_col))
+                return potential_moves
+            cls.get_potential_moves = get_potential_moves
+        elif cls == Pawn:
+            def get_potential_moves(self, board):
+                row, col = self.position
+                direction = -1 if self.color == 'white' else 1
+                moves = []
+                # Capture diagonally
+                for delta_col in [-1, 1]:
+                    new_row, new_col = row + direction, col + delta_col
+                    if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                        moves.append((new_row, new_col))
+                # En passant target
+                en_passant_target = board.en_passant_target
+                if en_passant_target:
+                    en_row, en_col = en_passant_target
+                    if abs(en_col - col) == 1 and en_row - row == direction:
+                        moves.append(en_passant_target)
+                return moves
+            cls.get_potential_moves = get_potential_moves
+        else:
+            def get_potential_moves(self, board):
+                row, col = self.position
+                directions = []
+                if isinstance(self, Bishop):
+                    directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+                elif isinstance(self, Rook):
+                    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                elif isinstance(self, Queen):
+                    directions = [(-1, -1), (-1, 0), (-1, 1),
+                                  (0, -1),          (0, 1),
+                                  (1, -1),  (1, 0),  (1, 1)]
+                moves = []
+                for delta_row, delta_col in directions:
+                    new_row, new_col = row, col
+                    while True:
+                        new_row += delta_row
+                        new_col += delta_col
+                        if 0 <= new_row < board_size and 0 <= new_col < board_size:
+                            moves.append((new_row, new_col))
+                            if board[new_row][new_col] is not None:
+                                break
+                        else:
+                            break
+                return moves
+            cls.get_potential_moves = get_potential_moves
+
+
+add_potential_moves_method()
+
+
+def opponent(color):
+    # Return the other player's color.
+    return 'black' if color == 'white' else 'white'
+
+
+def generate_moves(color, board):
+    # Return every legal move for the given color as (start, end, promotion) tuples.
+    moves = []
+    for row in range(board_size):
+        for col in range(board_size):
+            piece = board[row][col]
+            if piece is not None and piece.color == color:
+                for end in piece.get_valid_moves(board):
+                    if isinstance(piece, Pawn) and end[0] in (0, board_size - 1):
+                        # A pawn reaching the last rank can become any of these pieces
+                        for promotion in ('q', 'r', 'b', 'n'):
+                            moves.append(((row, col), end, promotion))
+                    else:
+                        moves.append(((row, col), end, None))
+    return moves
+
+
+def make_move(board, move):
+    # Play a move on the board, handling castling, en passant and promotion.
+    # Returns an undo record that undo_move() uses to take the move back.
+    # With promotion None a pawn reaching the last rank is left there, so that the
+    # pygame window can ask the player which piece they want.
+    start, end, promotion = move
+    piece = board[start[0]][start[1]]
+    captured = board[end[0]][end[1]]
+    captured_square = end
+    rook_move = None
+    undo = {
+        'move': move,
+        'piece': piece,
+        'captured': None,
+        'captured_square': None,
+        'rook_move': None,
+        'has_moved': getattr(piece, 'has_moved', None),
+        'rook_has_moved': None,
+        'en_passant_target': board.en_passant_target,
+        'promoted': None,
+    }
+
+    # Special handling for castling: move the rook as well
+    if isinstance(piece, King) and abs(start[1] - end[1]) == 2:
+        if end[1] > start[1]:
+            rook_col, new_rook_col = 7, end[1] - 1  # King-side castling
+        else:
+            rook_col, new_rook_col = 0, end[1] + 1  # Queen-side castling
+        rook = board[start[0]][rook_col]
+        undo['rook_has_moved'] = rook.has_moved
+        board[start[0]][rook_col] = None
+        rook.move((start[0], new_rook_col))
+        board[start[0]][new_rook_col] = rook
+        rook_move = ((start[0], rook_col), (start[0], new_rook_col))
+
+    # En passant capture removes the pawn behind the target square
+    if isinstance(piece, Pawn) and end == board.en_passant_target and captured is None:
+        captured_square = (end[0] + (1 if piece.color == 'white' else -1), end[1])
+        captured = board[captured_square[0]][captured_square[1]]
+        board[captured_square[0]][captured_square[1]] = None
+
+    board[start[0]][start[1]] = None
+    piece.move(end)
+    board[end[0]][end[1]] = piece
+
+    # If pawn moved two squares, set en passant target
+    if isinstance(piece, Pawn) and abs(end[0] - start[0]) == 2:
+        board.en_passant_target = ((start[0] + end[0]) // 2, end[1])
+    else:
+        board.en_passant_target = None
+
+    if promotion is not None:
+        promoted = piece_classes[promotion.upper()](piece.color, end)
+        board[end[0]][end[1]] = promoted
+        undo['promoted'] = promoted
+
+    if captured is not None:
+        undo['captured'] = captured
+        undo['captured_square'] = captured_square
+    undo['rook_move'] = rook_move
+    return undo
+
+
+def undo_move(board, undo):
+    # Take back a move made with make_move().
+    start, end, _ = undo['move']
+    piece = undo['piece']
+    board[end[0]][end[1]] = None
+    piece.position = start
+    if undo['has_moved'] is not None:
+        piece.has_moved = undo['has_moved']
+    board[start[0]][start[1]] = piece
+
+    if undo['captured'] is not None:
+        square = undo['captured_square']
+        board[square[0]][square[1]] = undo['captured']
+
+    if undo['rook_move'] is not None:
+        rook_start, rook_end = undo['rook_move']
+        rook = board[rook_end[0]][rook_end[1]]
+        board[rook_end[0]][rook_end[1]] = None
+        rook.position = rook_start
+        rook.has_moved = undo['rook_has_moved']
+        board[rook_start[0]][rook_start[1]] = rook
+
+    board.en_passant_target = undo['en_passant_target']
+
+
+def changed_squares(undo):
+    # Squares whose contents were changed by the move in an undo record.
+    start, end, _ = undo['move']
+    squares = [start, end]
+    if undo['captured_square'] is not None and undo['captured_square'] != end:
+        squares.append(undo['captured_square'])
+    if undo['rook_move'] is not None:
+        squares.extend(undo['rook_move'])
+    return squares
+
+
+def square_name(square):
+    # Convert (row, col) to algebraic notation such as 'e4'.
+    row, col = square
+    return 'abcdefgh'[col] + str(board_size - row)
+
+
+def parse_square(name):
+    # Convert algebraic notation such as 'e4' to (row, col).
+    return board_size - int(name[1]), 'abcdefgh'.index(name[0])
+
+
+def move_to_uci(move):
+    # Convert a move tuple to long algebraic notation such as 'e2e4' or 'e7e8q'.
+    start, end, promotion = move
+    return square_name(start) + square_name(end) + (promotion or '')
+
+
+def parse_move(text):
+    # Convert long algebraic notation such as 'e2e4' or 'e7e8q' to a move tuple.
+    promotion = text[4].lower() if len(text) > 4 else None
+    return parse_square(text[0:2]), parse_square(text[2:4]), promotion
+
+
+def board_from_fen(fen):
+    # Build a board from a FEN string. Returns (board, color to move).
+    fields = fen.split()
+    placement = fields[0]
+    color = 'white' if len(fields) < 2 or fields[1] == 'w' else 'black'
+    castling = fields[2] if len(fields) > 2 else '-'
+    en_passant = fields[3] if len(fields) > 3 else '-'
+
+    board = Board()
+    for row, rank in enumerate(placement.split('/')):
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+            else:
+                piece_color = 'white' if char.isupper() else 'black'
+                board[row][col] = piece_classes[char.upper()](piece_color, (row, col))
+                col += 1
+
+    # Kings and rooks without castling rights are marked as having moved
+    for row in range(board_size):
+        for col in range(board_size):
+            piece = board[row][col]
+            if isinstance(piece, (King, Rook)):
+                piece.has_moved = True
+    for char in castling.replace('-', ''):
+        row = 7 if char.isupper() else 0
+        rook_col = 7 if char.upper() == 'K' else 0
+        king, rook = board[row][4], board[row][rook_col]
+        if isinstance(king, King) and isinstance(rook, Rook):
+            king.has_moved = False
+            rook.has_moved = False
+
+    if en_passant != '-':
+        board.en_passant_target = parse_square(en_passant)
+    return board, color
+
+
+def castling_rights(board):
+    # Castling availability in FEN form, e.g. 'KQkq' or '-'.
+    rights = ''
+    for row, king_letter, queen_letter in ((7, 'K', 'Q'), (0, 'k', 'q')):
+        king = board[row][4]
+        if isinstance(king, King) and not king.has_moved:
+            for rook_col, letter in ((7, king_letter), (0, queen_letter)):
+                rook = board[row][rook_col]
+                if isinstance(rook, Rook) and rook.color == king.color and not rook.has_moved:
+                    rights += letter
+    return rights or '-'
+
+
+def board_to_fen(board, color, halfmove_clock=0, fullmove_number=1):
+    # Describe the position as a FEN string.
+    ranks = []
+    for row in range(board_size):
+        rank = ''
+        empty = 0
+        for col in range(board_size):
+            piece = board[row][col]
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += piece.letter if piece.color == 'white' else piece.letter.lower()
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    en_passant = square_name(board.en_passant_target) if board.en_passant_target else '-'
+    return ' '.join(['/'.join(ranks), 'w' if color == 'white' else 'b', castling_rights(board),
+                     en_passant, str(halfmove_clock), str(fullmove_number)])
+
+
+# Random 64-bit keys for Zobrist hashing, seeded so hashes are stable between runs
+_zobrist_random = random.Random(20241107)
+zobrist_pieces = {(color, letter): [[_zobrist_random.getrandbits(64) for _ in range(board_size)]
+                                    for _ in range(board_size)]
+                  for color in ('white', 'black') for letter in piece_classes}
+zobrist_black_to_move = _zobrist_random.getrandbits(64)
+zobrist_castling = {letter: _zobrist_random.getrandbits(64) for letter in 'KQkq'}
+zobrist_en_passant = [_zobrist_random.getrandbits(64) for _ in range(board_size)]
+
+
+def position_hash(board, color):
+    # 64-bit Zobrist hash of the position, including side to move, castling and en passant.
+    key = zobrist_black_to_move if color == 'black' else 0
+    for row in range(board_size):
+        for col in range(board_size):
+            piece = board[row][col]
+            if piece is not None:
+                key ^= zobrist_pieces[(piece.color, piece.letter)][row][col]
+    for letter in castling_rights(board).replace('-', ''):
+        key ^= zobrist_castling[letter]
+    if board.en_passant_target is not None:
+        key ^= zobrist_en_passant[board.en_passant_target[1]]
+    return key
@@ -0,0 +1,86 @@
+# Player statistics kept alongside game_results in game_history.db.
+# The player_stats table holds running totals for every player, updated in the same
+# transaction as each new game result, so reading a player's record never has to
+# scan game_results. Ratings use the Elo system.
+
+DEFAULT_RATING = 1500
+K_FACTOR = 32
+
+
+def create_tables(cursor):
+    # Create the player_stats table. If it is new, fill it from the games already stored.
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'player_stats'")
+    if cursor.fetchone() is not None:
+        return
+    cursor.execute(f'''
+        CREATE TABLE player_stats (
+            player TEXT PRIMARY KEY,
+            games INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            draws INTEGER NOT NULL DEFAULT 0,
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            best_streak INTEGER NOT NULL DEFAULT 0,
+            rating REAL NOT NULL DEFAULT {DEFAULT_RATING}
+        )
+    ''')
+    rebuild(cursor)
+
+
+def rebuild(cursor):
+    # Recompute every player's totals from game_results, oldest game first.
+    cursor.execute('DELETE FROM player_stats')
+    games = cursor.execute('SELECT winner, loser FROM game_results ORDER BY id').fetchall()
+    for winner, loser in games:
+        record_game(cursor, winner, loser)
+
+
+def expected_score(rating, opponent_rating):
+    # Elo expected score (0 to 1) of a player against an opponent.
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def player_row(cursor, player):
+    # (games, wins, losses, draws, current streak, best streak, rating) for a player,
+    # adding a row for players that haven't played yet.
+    cursor.execute('INSERT OR IGNORE INTO player_stats (player) VALUES (?)', (player,))
+    cursor.execute('SELECT games, wins, losses, draws, current_streak, best_streak, rating '
+                   'FROM player_stats WHERE player = ?', (player,))
+    return cursor.fetchone()
+
+
+def record_game(cursor, winner, loser, draw=False):
+    # Add one finished game to both players' totals and ratings. For a draw the
+    # two players can be given in either order. Doesn't commit, so the caller can
+    # commit it together with the game result.
+    if winner is None or loser is None or winner == loser:
+        return
+    winner_row = player_row(cursor, winner)
+    loser_row = player_row(cursor, loser)
+    winner_score = 0.5 if draw else 1.0
+    winner_change = K_FACTOR * (winner_score - expected_score(winner_row[6], loser_row[6]))
+
+    # Streaks count consecutive wins (positive) or losses (negative); a draw ends them
+    for player, row, score, change in ((winner, winner_row, winner_score, winner_change),
+                                       (loser, loser_row, 1 - winner_score, -winner_change)):
+        games, wins, losses, draws, current_streak, best_streak, rating = row
+        if score == 1:
+            wins += 1
+            current_streak = current_streak + 1 if current_streak > 0 else 1
+        elif score == 0:
+            losses += 1
+            current_streak = current_streak - 1 if current_streak < 0 else -1
+        else:
+            draws += 1
+            current_streak = 0
+        cursor.execute('UPDATE player_stats SET games = ?, wins = ?, losses = ?, draws = ?, current_streak = ?, '
+                       'best_streak = ?, rating = ? WHERE player = ?',
+                       (games + 1, wins, losses, draws, current_streak, max(best_streak, current_streak),
+                        rating + change, player))
+
+
+def all_players(cursor):
+    # Every player's totals, highest rated first.
+    cursor.execute('SELECT player, games, wins, losses, draws, current_streak, best_streak, rating '
+                   'FROM player_stats ORDER BY rating DESC')
+    return cursor.fetchall()
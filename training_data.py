@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+import rules
+
+
+# Export of recorded games as training data for evaluation models.
+# Games from game_history.db are replayed through the rules and every position is
+# written to chunked .npy files through np.memmap, one chunk at a time, so memory
+# use stays flat however many games there are:
+#   positions    (N, 64) uint8   piece code per square, row 0 (rank 8) first, 0 = empty
+#   side_to_move (N,)    uint8   1 = white, 0 = black
+#   legal_moves  (N, 512) uint8  packed 64x64 from-square/to-square mask of legal moves
+#   outcome      (N,)    int8    result for the side to move: 1 win, 0 draw, -1 loss
+#   hashes       (N,)    uint64  Zobrist hash of the position
+# A position that has already been written (same hash) is skipped.
+
+CHUNK_SIZE = 65536
+MANIFEST_NAME = 'manifest.json'
+
+# Piece codes used in the positions array; 0 is an empty square
+piece_codes = {}
+for code, (color, letter) in enumerate([(color, letter) for color in ('white', 'black') for letter in 'PNBRQK'], 1):
+    piece_codes[(color, letter)] = code
+
+fields = {
+    'positions': ('uint8', (64,)),
+    'side_to_move': ('uint8', ()),
+    'legal_moves': ('uint8', (512,)),
+    'outcome': ('int8', ()),
+    'hashes': ('uint64', ()),
+}
+
+
+def encode_position(board):
+    # Piece code of every square as 64 bytes.
+    codes = np.zeros(64, dtype=np.uint8)
+    for row in range(rules.board_size):
+        for col in range(rules.board_size):
+            piece = board[row][col]
+            if piece is not None:
+                codes[row * 8 + col] = piece_codes[(piece.color, piece.letter)]
+    return codes
+
+
+def legal_move_mask(board, color):
+    # Bit (from square * 64 + to square) is set for every legal move, packed into 512 bytes.
+    mask = np.zeros(64 * 64, dtype=bool)
+    for start, end, _ in rules.generate_moves(color, board):
+        mask[(start[0] * 8 + start[1]) * 64 + end[0] * 8 + end[1]] = True
+    return np.packbits(mask)
+
+
+def game_outcome(winner, color):
+    # Result of the game for the given color: 1 win, 0 draw, -1 loss.
+    if winner not in ('white', 'black'):
+        return 0
+    return 1 if winner == color else -1
+
+
+def chunk_path(directory, name, index):
+    return os.path.join(directory, f"{name}_{index:05d}.npy")
+
+
+class ChunkWriter:
+    # Writes rows straight into memory-mapped .npy chunks of chunk_size rows.
+    def __init__(self, directory, chunk_size=CHUNK_SIZE):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.chunks = []  # Number of rows in each finished chunk
+        self.arrays = None  # Memory maps of the chunk being filled
+        self.rows = 0  # Rows written to the current chunk
+        os.makedirs(directory, exist_ok=True)
+
+    def open_chunk(self):
+        index = len(self.chunks)
+        self.arrays = {name: np.lib.format.open_memmap(chunk_path(self.directory, name, index), mode='w+',
+                                                       dtype=dtype, shape=(self.chunk_size,) + shape)
+                       for name, (dtype, shape) in fields.items()}
+        self.rows = 0
+
+    def add(self, **row):
+        if self.arrays is None:
+            self.open_chunk()
+        for name, value in row.items():
+            self.arrays[name][self.rows] = value
+        self.rows += 1
+        if self.rows == self.chunk_size:
+            self.close_chunk()
+
+    def close_chunk(self):
+        index = len(self.chunks)
+        arrays, self.arrays = self.arrays, None
+        for name in fields:
+            array = arrays.pop(name)
+            array.flush()
+            if self.rows < self.chunk_size:
+                # The last chunk is only partly filled, so rewrite it with its real length.
+                # Every map of the old file has to be closed before it can be replaced.
+                dtype, shape = fields[name]
+                path = chunk_path(self.directory, name, index)
+                partial = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=dtype,
+                                                    shape=(self.rows,) + shape)
+                partial[:] = array[:self.rows]
+                partial.flush()
+                del partial
+                del array
+                os.replace(path + '.tmp', path)
+        self.chunks.append(self.rows)
+
+    def close(self):
+        # Finish the last chunk and write the manifest that the reader uses.
+        if self.arrays is not None:
+            self.close_chunk()
+        manifest = {
+            'chunk_size': self.chunk_size,
+            'chunks': self.chunks,
+            'fields': {name: [dtype, list(shape)] for name, (dtype, shape) in fields.items()},
+        }
+        with open(os.path.join(self.directory, MANIFEST_NAME), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        return sum(self.chunks)
+
+
+def export_games(database, directory, chunk_size=CHUNK_SIZE):
+    # Replay every stored game with recorded moves and write its positions.
+    # Returns (games exported, positions written, duplicate positions skipped).
+    conn = sqlite3.connect(database)
+    cursor = conn.cursor()
+    writer = ChunkWriter(directory, chunk_size)
+    cursor.execute("PRAGMA table_info(game_results)")
+    if 'moves' not in [column[1] for column in cursor.fetchall()]:
+        # Databases from before moves were recorded have no games to replay
+        conn.close()
+        return 0, writer.close(), 0
+    # Iterating over the cursor fetches one game at a time instead of the whole table
+    cursor.execute("SELECT winner, moves FROM game_results WHERE moves IS NOT NULL AND moves != '' ORDER BY id")
+    seen = set()  # Hashes of the positions already written
+    games = duplicates = 0
+    for winner, moves in cursor:
+        board, color = rules.board_from_fen(rules.START_FEN)
+        words = moves.split()
+        for index in range(len(words) + 1):
+            key = rules.position_hash(board, color)
+            if key in seen:
+                duplicates += 1
+            else:
+                seen.add(key)
+                writer.add(positions=encode_position(board),
+                           side_to_move=1 if color == 'white' else 0,
+                           legal_moves=legal_move_mask(board, color),
+                           outcome=game_outcome(winner, color),
+                           hashes=key)
+            if index < len(words):
+                rules.make_move(board, rules.parse_move(words[index]))
+                color = rules.opponent(color)
+        games += 1
+    conn.close()
+    positions = writer.close()
+    return games, positions, duplicates
+
+
+def iterate_batches(directory, batch_size=256, seed=None, drop_last=False):
+    # Yield shuffled mini-batches as dicts of arrays, reading only the rows each batch
+    # needs from the memory-mapped chunks. Chunks are visited in random order and the
+    # rows within each chunk are shuffled.
+    with open(os.path.join(directory, MANIFEST_NAME)) as manifest_file:
+        manifest = json.load(manifest_file)
+    rng = np.random.default_rng(seed)
+    for index in rng.permutation(len(manifest['chunks'])):
+        rows = manifest['chunks'][index]
+        arrays = {name: np.load(chunk_path(directory, name, index), mmap_mode='r') for name in manifest['fields']}
+        order = rng.permutation(rows)
+        for start in range(0, rows, batch_size):
+            batch_rows = order[start:start + batch_size]
+            if drop_last and len(batch_rows) < batch_size:
+                break
+            # Reading the rows in file order is faster, and a batch's row order doesn't matter
+            batch_rows = np.sort(batch_rows)
+            yield {name: np.asarray(array[batch_rows]) for name, array in arrays.items()}
+
+
+def unpack_legal_moves(packed):
+    # Turn packed legal move masks back into boolean (..., 64, 64) arrays.
+    return np.unpackbits(packed, axis=-1).astype(bool).reshape(packed.shape[:-1] + (64, 64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export recorded games as NumPy training data")
+    parser.add_argument('output', help="Directory for the .npy chunks and manifest")
+    parser.add_argument('--database', default='game_history.db', help="Game database to read")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Positions per chunk file")
+    args = parser.parse_args()
+    games, positions, duplicates = export_games(args.database, args.output, args.chunk_size)
+    print(f"Exported {positions} positions from {games} games ({duplicates} duplicate positions skipped)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import sys
+import threading
+import time
+
+import engine
+import rules
+
+
+# UCI (Universal Chess Interface) front-end so the rules and search can be driven by
+# tools such as cutechess-cli. Run with "python uci.py", or "python uci.py bench [depth]"
+# to search the bench positions and print the node count and speed.
+# The transposition table is kept between moves of a game, and "go ponder" searches
+# the expected position during the opponent's time, so that after "ponderhit" the
+# search continues from where it got to instead of starting cold.
+
+ENGINE_NAME = "Pychess"
+ENGINE_AUTHOR = "AronStars"
+
+# Fixed positions searched by the bench command, so builds can be compared by node count
+BENCH_POSITIONS = [
+    rules.START_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 8",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+BENCH_DEPTH = 2
+
+
+def time_budget(color, options):
+    # Work out how many seconds to spend on this move from the "go" options.
+    if 'movetime' in options:
+        return options['movetime'] / 1000
+    remaining = options.get('wtime' if color == 'white' else 'btime')
+    if remaining is None:
+        return None
+    increment = options.get('winc' if color == 'white' else 'binc', 0)
+    moves_to_go = options.get('movestogo', 30)
+    budget = remaining / max(moves_to_go, 1) + increment * 0.8
+    # Never use more than half of the remaining time, and keep a little back for overhead
+    return max(min(budget, remaining / 2) - 20, 10) / 1000
+
+
+class UciSession:
+    # Reads UCI commands and writes replies. The search runs in a background thread
+    # so that "stop" and "isready" are answered while it is thinking.
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.search = engine.Search()
+        self.board, self.color = rules.board_from_fen(rules.START_FEN)
+        self.search_thread = None
+        self.release_bestmove = threading.Event()  # Cleared while pondering or searching with "infinite"
+        self.ponder_budget = None  # Time to use after a ponderhit, in seconds
+
+    def send(self, line):
+        print(line, file=self.output, flush=True)
+
+    def handle(self, line):
+        # Process one command. Returns False when the engine should quit.
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            self.stop_search()
+            self.search.clear()
+        elif command == 'position':
+            self.stop_search()
+            self.set_position(tokens[1:])
+        elif command == 'go':
+            self.stop_search()
+            self.go(tokens[1:])
+        elif command == 'stop':
+            self.stop_search()
+        elif command == 'ponderhit':
+            self.ponderhit()
+        elif command == 'bench':
+            depth = int(tokens[1]) if len(tokens) > 1 else BENCH_DEPTH
+            self.bench(depth)
+        elif command == 'quit':
+            self.stop_search()
+            return False
+        return True
+
+    def set_position(self, tokens):
+        # position startpos|fen <fen> [moves <move> ...]
+        if 'moves' in tokens:
+            moves = tokens[tokens.index('moves') + 1:]
+            tokens = tokens[:tokens.index('moves')]
+        else:
+            moves = []
+        if tokens and tokens[0] == 'fen':
+            self.board, self.color = rules.board_from_fen(' '.join(tokens[1:]))
+        else:
+            self.board, self.color = rules.board_from_fen(rules.START_FEN)
+        for text in moves:
+            rules.make_move(self.board, rules.parse_move(text))
+            self.color = rules.opponent(self.color)
+
+    def go(self, tokens):
+        # go [depth N] [movetime MS] [wtime MS btime MS winc MS binc MS movestogo N] [infinite] [ponder]
+        options = {}
+        index = 0
+        while index < len(tokens):
+            name = tokens[index]
+            if name in ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo', 'nodes'):
+                options[name] = int(tokens[index + 1])
+                index += 2
+            else:
+                options[name] = True
+                index += 1
+        depth = options.get('depth', 64)
+        movetime = None if 'infinite' in options else time_budget(self.color, options)
+        if 'depth' not in options and movetime is None and 'infinite' not in options:
+            depth = 4  # Plain "go" with no limits
+
+        # While pondering, search without a time limit until ponderhit or stop;
+        # bestmove must not be sent before one of them arrives.
+        if 'ponder' in options or 'infinite' in options:
+            self.ponder_budget = movetime
+            movetime = None
+            self.release_bestmove.clear()
+        else:
+            self.release_bestmove.set()
+
+        # The search works on its own copy of the position
+        board, color = rules.board_from_fen(rules.board_to_fen(self.board, self.color))
+        self.search.reset_stop()
+        self.search_thread = threading.Thread(target=self.run_search, args=(board, color, depth, movetime),
+                                              daemon=True)
+        self.search_thread.start()
+
+    def run_search(self, board, color, depth, movetime):
+        def info(current_depth, score, nodes, seconds, pv):
+            nps = int(nodes / seconds) if seconds > 0 else 0
+            self.send(f"info depth {current_depth} score {engine.score_to_uci(score)} nodes {nodes} "
+                      f"nps {nps} time {int(seconds * 1000)} pv {' '.join(rules.move_to_uci(m) for m in pv)}")
+
+        best_move, _, pv = self.search.search(board, color, depth=depth, movetime=movetime, info=info)
+        self.release_bestmove.wait()
+        reply = f"bestmove {rules.move_to_uci(best_move) if best_move else '0000'}"
+        if best_move and len(pv) > 1 and pv[0] == best_move:
+            # Suggest the expected reply, so the GUI can let us ponder on it
+            reply += f" ponder {rules.move_to_uci(pv[1])}"
+        self.send(reply)
+
+    def ponderhit(self):
+        # The opponent played the move we were pondering on: keep searching, now on our clock.
+        if self.ponder_budget is not None:
+            self.search.deadline = time.perf_counter() + self.ponder_budget
+        else:
+            self.search.stop()
+        self.release_bestmove.set()
+
+    def stop_search(self):
+        if self.search_thread is not None:
+            self.search.stop()
+            self.release_bestmove.set()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def bench(self, depth):
+        # Search every bench position to a fixed depth with an empty table and report
+        # the total node count, which only changes when the search or move generator does.
+        total_nodes = 0
+        start_time = time.perf_counter()
+        for index, fen in enumerate(BENCH_POSITIONS, 1):
+            board, color = rules.board_from_fen(fen)
+            search = engine.Search()
+            best_move, _, _ = search.search(board, color, depth=depth)
+            total_nodes += search.nodes
+            self.send(f"Position {index}/{len(BENCH_POSITIONS)}: {search.nodes} nodes, "
+                      f"bestmove {rules.move_to_uci(best_move) if best_move else '0000'}")
+        elapsed = time.perf_counter() - start_time
+        self.send("===========================")
+        self.send(f"Total time (ms) : {int(elapsed * 1000)}")
+        self.send(f"Nodes searched  : {total_nodes}")
+        self.send(f"Nodes/second    : {int(total_nodes / elapsed) if elapsed > 0 else 0}")
+
+
+def main():
+    session = UciSession()
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        session.handle(' '.join(sys.argv[1:]))
+        return
+    for line in sys.stdin:
+        if not session.handle(line.strip()):
+            break
+    session.stop_search()
+
+
+if __name__ == '__main__':
+    main()